@@ -19,6 +19,8 @@ class SearchModes(Enum):
 		BFS = 		2
 		Dijkstra = 	3
 		AStar = 	4
+		BiDijkstra = 5
+		BiAStar = 	6
 
 class Game():
 	def __init__(self, map):
@@ -36,6 +36,7 @@ class SparseGraph(object):
         self.digraph = digraph
         self.next_node_idx = 0
         self.cost_h = None # heuristic cost function reference
+        self.reversed = None # cached reverse graph, see get_reverse()
 
     def is_empty(self):
         ''' Return True if graph contains no nodes '''
@@ -75,6 +76,7 @@ class SparseGraph(object):
         if node.idx < 0:
             node.idx = self.next_node_idx
         self.next_node_idx = node.idx + 1
+        self.reversed = None
         # Keep the node, prepare the edgelist for edges
         self.nodes[node.idx] = node
         self.edgelist[node.idx] = {}
@@ -83,6 +85,7 @@ class SparseGraph(object):
 
     def remove_node(self, idx):
         ''' remove this node, and any edges to/from other nodes '''
+        self.reversed = None
         del self.nodes[idx]
         if idx in self.edgelist:
             del self.edgelist[idx]
@@ -95,6 +98,7 @@ class SparseGraph(object):
         If not a digraph then create back edge to match. '''
 
         assert (edge.from_idx in self.nodes and edge.to_idx in self.nodes), 'invalid node idx'
+        self.reversed = None
         self.edgelist[edge.from_idx][edge.to_idx] = edge
 
         if not self.digraph:
@@ -103,6 +107,7 @@ class SparseGraph(object):
 
     def remove_edge(self, from_idx, to_idx):
         ''' Remove edge. If not a digraph remove back edge also'''
+        self.reversed = None
         if from_idx in self.edgelist:
             if to_idx in self.edgelist[from_idx]:
                 del self.edgelist[from_idx][to_idx]
@@ -124,6 +129,7 @@ class SparseGraph(object):
         self.next_node_idx = 0
         self.nodes = {}
         self.edgelist = {}
+        self.reversed = None
 
     def path_cost(self, path):
         '''Return the cost of travelling on each node in the path list.'''
@@ -136,6 +142,29 @@ class SparseGraph(object):
     def summary(self):
         return 'n:%d e:%d (digraph:%d)' % (self.num_nodes(), self.num_edges(), self.digraph)
 
+    def reverse(self):
+        ''' Return a new graph with the same nodes and every edge flipped
+        (same cost). Used to search backwards from a target. '''
+        g = SparseGraph(self.digraph)
+        g.cost_h = self.cost_h
+        for idx, node in self.nodes.items():
+            g.nodes[idx] = node
+            g.edgelist[idx] = {}
+        g.next_node_idx = self.next_node_idx
+        for from_idx, edges in self.edgelist.items():
+            for to_idx, edge in edges.items():
+                g.edgelist[to_idx][from_idx] = Edge(to_idx, from_idx, edge.cost)
+        return g
+
+    def get_reverse(self):
+        ''' Return the reverse graph, built on first use and kept until this
+        graph is changed. An undirected graph is its own reverse. '''
+        if not self.digraph:
+            return self
+        if self.reversed is None:
+            self.reversed = self.reverse()
+        return self.reversed
+
     def get_adj_list_str(self):
         ''' simple method to pretty-format (sorted) edges as an adjacency list '''
         result = []
@@ -9,24 +9,52 @@ permission.
 See readme.txt for details.
 
 '''
-from heapq import heappush, heappop
+from collections import deque
+
+INF = float('inf')
 
 class PriorityQueue(object):
-	''' Cost sorted (min-to-max) queue. Equal cost items revert to FIFO order.'''
+	''' Cost sorted (min-to-max) queue. Equal cost items revert to FIFO order.
+	Each queued item is indexed by its heap slot, so membership, cost lookup,
+	remove and decrease_key do not need to scan the queue. Items must be
+	hashable and can only be queued once.'''
 
 	def __init__(self):
-		self.q = []
+		self.q = [] # binary heap of (cost, order, item) tuples
+		self.pos = {} # dict of {item: heap slot} items
 		self.i = 0 # default order counter
 
 	def push(self, item, cost):
 		'''Add an item and its cost to the queue. '''
-		heappush(self.q, (cost, self.i, item))
+		assert item not in self.pos, 'item already queued'
+		self.q.append((cost, self.i, item))
+		self.pos[item] = len(self.q) - 1
 		self.i += 1
+		self._sift_up(len(self.q) - 1)
 
 	def pop(self):
 		'''Remove the item of lowest cost, or FIFO order if cost equal.
 		Returns the item (whatever it is) and the cost as a tuple. '''
-		cost, i, item = heappop(self.q)
+		cost, i, item = self.q[0]
+		self._remove_slot(0)
+		return item, cost
+
+	def decrease_key(self, item, cost):
+		'''Lower the cost of a queued item. The item is then ordered as if it
+		was just pushed. Returns False (and changes nothing) if the new cost is
+		not better than the current one. '''
+		slot = self.pos[item]
+		if self.q[slot][0] <= cost:
+			return False
+		self.q[slot] = (cost, self.i, item)
+		self.i += 1
+		self._sift_up(slot)
+		return True
+
+	def top(self):
+		'''Return the (item, cost) tuple that pop would return, without
+		removing it. '''
+		cost, i, item = self.q[0]
 		return item, cost
 
 	def __len__(self):
@@ -37,7 +65,7 @@ class PriorityQueue(object):
 		return 'pq: ' + str(sorted(self.q))
 
 	def __contains__(self, item):
-		return any(item == values[2] for values in self.q)
+		return item in self.pos
 
 	def __iter__(self):
 		'''Support iteration. This enables support of the "in" operator. '''
@@ -45,16 +73,53 @@ class PriorityQueue(object):
 
 	def peek(self, item):
 		'''Return a tuple of (item, cost) if it exists, without removing. '''
-		for values in self.q:
-			if values[2] == item:
-				return (item, values[0])
+		if item in self.pos:
+			return (item, self.q[self.pos[item]][0])
 
 	def remove(self, item):
-		'''Remove the first item that matches.'''
-		for i, values in enumerate(self.q):
-			if values[2] == item:
-				del self.q[i]
-				return
+		'''Remove the item if it is queued.'''
+		if item in self.pos:
+			self._remove_slot(self.pos[item])
+
+	def _remove_slot(self, slot):
+		''' Fill the slot with the last entry and restore the heap order. '''
+		del self.pos[self.q[slot][2]]
+		last = self.q.pop()
+		if slot < len(self.q):
+			self.q[slot] = last
+			self.pos[last[2]] = slot
+			self._sift_up(slot)
+			self._sift_down(self.pos[last[2]])
+
+	def _sift_up(self, slot):
+		q, pos = self.q, self.pos
+		entry = q[slot]
+		while slot > 0:
+			parent = (slot - 1) >> 1
+			if q[parent] <= entry:
+				break
+			q[slot] = q[parent]
+			pos[q[slot][2]] = slot
+			slot = parent
+		q[slot] = entry
+		pos[entry[2]] = slot
+
+	def _sift_down(self, slot):
+		q, pos = self.q, self.pos
+		entry = q[slot]
+		end = len(q)
+		child = 2 * slot + 1
+		while child < end:
+			if child + 1 < end and q[child + 1] < q[child]:
+				child += 1
+			if entry <= q[child]:
+				break
+			q[slot] = q[child]
+			pos[q[slot][2]] = slot
+			slot = child
+			child = 2 * slot + 1
+		q[slot] = entry
+		pos[entry[2]] = slot
 
 
 class Path(object):
@@ -104,7 +169,7 @@ def SearchDFS(graph, source_idx, target_idx, limit=0):
 	''' Depth First Search. '''
 	closed = set() # set - of visited nodes
 	route = {} # dict of {to:from} items to find our way home
-	open = [] # use a list as a LIFO stack of the current leaf edges
+	open = deque() # use a deque as a LIFO stack of the current leaf edges
 	steps = 0 # if limit
 	# add the starting source as an edge tuple to self
 	open.append( source_idx )
@@ -119,7 +184,9 @@ def SearchDFS(graph, source_idx, target_idx, limit=0):
 		else:
 			idxs = graph.get_neighbours(leaf)
 			for dest in idxs:
-				if dest not in closed and dest not in open:
+				# every visited or open node is in route, so one dict lookup
+				# replaces scanning the open stack
+				if dest not in route:
 					route[dest] = leaf # to:from
 					open.append( dest )
 		# stop early?
@@ -132,7 +199,7 @@ def SearchBFS(graph, source_idx, target_idx, limit=0):
 	''' Breadth First Search. '''
 	closed = set() # set - of visited nodes
 	route = {} # dict of {to:from} items to find our way home
-	open = [] # use a list as a FIFO queue of the current leaf edges
+	open = deque() # use a deque as a FIFO queue of the current leaf edges
 	steps = 0 # if limit
 
 	# add the starting source as an edge tuple to self
@@ -141,14 +208,14 @@ def SearchBFS(graph, source_idx, target_idx, limit=0):
 	# search loop
 	while len(open):
 		steps += 1
-		leaf = open.pop(0) # get's the first (FIFO) node to investigate
+		leaf = open.popleft() # get's the first (FIFO) node to investigate
 		closed.add(leaf)
 		if leaf == target_idx:
 			break
 		else:
 			idxs = graph.get_neighbours(leaf)
 			for dest in idxs:
-				if dest not in closed and dest not in open: # visited
+				if dest not in route: # visited or already open
 					route[dest] = leaf # to:from
 					open.append( dest )
 		# stop early?
@@ -180,12 +247,11 @@ def SearchDijkstra(graph, source_idx, target_idx, limit=0):
 				if dest not in closed: # visited
 					cost_f = cost + graph.get_edge(leaf,dest).cost # cost_g
 					if dest in open: # old path to same node?
-						if open.peek(dest)[1] <= cost_f: # if better, keep it
+						if not open.decrease_key(dest, cost_f): # if better, keep it
 							continue
-						else: # remove the old, and the new one be added
-							open.remove(dest)
+					else:
+						open.push(dest, cost_f)
 					route[dest] = leaf # to:from
-					open.push(dest, cost_f )
 		# stop early?
 		if limit > 0 and steps >= limit:
 			break
@@ -219,18 +285,100 @@ def SearchAStar(graph, source_idx, target_idx, limit=0):
 					cost_h = graph.cost_h(dest, target_idx) # H estimated-cost
 					cost_f = cost_g + cost_h
 					if dest in open:
-						if open.peek(dest)[1] <= cost_f:
+						if not open.decrease_key(dest, cost_f):
 							continue
-						else:
-							open.remove(dest)
+					else:
+						open.push(dest, cost_f)
 					route[dest] = leaf
-					open.push(dest, cost_f)
 		# stop early?
 		if limit > 0 and steps >= limit:
 			break
 	# return the partial/complete path details
 	return Path(graph, route, target_idx, open, closed, steps)
 
+def _SearchBidirectional(graph, source_idx, target_idx, limit, potential):
+	''' Two Dijkstra searches, forward from the source on the graph and
+	backward from the target on its reverse, each expanding the minimum
+	cost-so-far plus (forward) or minus (backward) the potential. Each step
+	expands one node on the side with the smaller queue. The best path seen
+	where the two sides meet is kept, and the search is done once the top
+	keys of the two queues add up to at least its cost. '''
+	graphs = (graph, graph.get_reverse())
+	signs = (1.0, -1.0)
+	closed = (set(), set()) # sets - of visited nodes, per side
+	route = ({}, {}) # dicts of {to:from} forward and {from:to} backward
+	dist = ({}, {}) # dicts of {idx: cost-so-far} per side
+	open = (PriorityQueue(), PriorityQueue()) # priority queues per side
+	best, meet = INF, None # cost and meeting node of the best path seen
+	steps = 0 # if limit
+	done = False
+
+	for side, root_idx in ((0, source_idx), (1, target_idx)):
+		open[side].push(root_idx, signs[side] * potential(root_idx))
+		route[side][root_idx] = root_idx
+		dist[side][root_idx] = 0.0
+	if source_idx == target_idx:
+		best, meet = 0.0, source_idx
+	# search loop
+	while True:
+		if not len(open[0]) or not len(open[1]):
+			done = True # one side has run out, so there is nothing better
+			break
+		if open[0].top()[1] + open[1].top()[1] >= best:
+			done = True # no path through the open nodes can beat the best
+			break
+		steps += 1
+		side = 0 if len(open[0]) <= len(open[1]) else 1
+		leaf, key = open[side].pop()
+		closed[side].add(leaf)
+		cost = dist[side][leaf]
+		for dest in graphs[side].get_neighbours(leaf):
+			if dest not in closed[side]: # visited
+				cost_g = cost + graphs[side].get_edge(leaf, dest).cost
+				key = cost_g + signs[side] * potential(dest)
+				if dest in open[side]:
+					if not open[side].decrease_key(dest, key):
+						continue
+				else:
+					open[side].push(dest, key)
+				route[side][dest] = leaf
+				dist[side][dest] = cost_g
+				# reached by the other side too?
+				if dest in dist[1 - side] and cost_g + dist[1 - side][dest] < best:
+					best, meet = cost_g + dist[1 - side][dest], dest
+		# stop early?
+		if limit > 0 and steps >= limit:
+			break
+	# join the forward route with the backward route from the meeting node
+	full_route = dict(route[0])
+	if meet is not None:
+		curr_idx = meet
+		while curr_idx != target_idx:
+			full_route[route[1][curr_idx]] = curr_idx # to:from
+			curr_idx = route[1][curr_idx]
+	full_open = set(open[0]) | set(open[1])
+	if done:
+		full_open.discard(target_idx) # the best path is proven
+	else:
+		full_open.add(target_idx) # the step limit stopped it first
+	# return the partial/complete path details
+	return Path(graph, full_route, target_idx, full_open, closed[0] | closed[1], steps)
+
+def SearchBiDijkstra(graph, source_idx, target_idx, limit=0):
+	''' Bidirectional Dijkstra Search. Expand the minimum path cost-so-far
+	from both the source and (on the reverse graph) the target. '''
+	def potential(idx):
+		return 0.0
+	return _SearchBidirectional(graph, source_idx, target_idx, limit, potential)
+
+def SearchBiAStar(graph, source_idx, target_idx, limit=0):
+	''' Bidirectional A* Search. Uses the average of the heuristic cost to
+	the target and the (negative) heuristic cost from the source as potential,
+	so that both sides agree and the stopping test stays exact when the
+	heuristic is consistent. '''
+	def potential(idx):
+		return (graph.cost_h(idx, target_idx) - graph.cost_h(source_idx, idx)) / 2.0
+	return _SearchBidirectional(graph, source_idx, target_idx, limit, potential)
 
 
 # A simple dictionary with string keys to each search class type.
@@ -239,6 +387,8 @@ SEARCHES = {
 	2: SearchBFS,
 	3: SearchDijkstra,
 	4: SearchAStar,
+	5: SearchBiDijkstra,
+	6: SearchBiAStar,
 }
 
 
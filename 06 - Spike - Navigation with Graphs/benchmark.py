@@ -0,0 +1,135 @@
+'''Headless search benchmark.
+
+Loads the shipped maps (map1.txt - map3.txt) and some generated large box
+worlds, runs every search in searches.SEARCHES over the same random
+start/target pairs for each traversal profile, and writes, as JSON, the
+expansions, wall time, peak memory and how far the path costs are from the
+best box by box ones (found with Dijkstra) of each search. Any-angle
+searches can beat those, so their gap can be below 0.
+
+	python benchmark.py [--pairs N] [--sizes N ...] [--seed N] [--out FILE]
+
+No window is needed, so it can be run (and compared) in a batch job.
+'''
+
+import argparse
+import json
+import random
+import tracemalloc
+from time import perf_counter
+
+from box_world import BoxWorld, TILE_CODES
+from searches import SEARCHES, GRID_SEARCHES, SearchDijkstraTree
+
+MAPS = ['map1.txt', 'map2.txt', 'map3.txt']
+
+# chance of each tile code (see box_world.TILE_CODES) in generated worlds
+TILE_WEIGHTS = [50, 10, 10, 10, 5, 15]
+
+def random_world(size, rng):
+	''' A size x size BoxWorld with random tiles. '''
+	tiles = bytearray(rng.choices(range(len(TILE_CODES)), TILE_WEIGHTS, k=size * size))
+	return BoxWorld(size, size, 720, 720, tiles)
+
+def random_pairs(graph, size, count, rng):
+	''' count random (source_idx, target_idx) pairs, with the best path cost
+	between them (None if there is no path). The source is never a wall, but
+	the target can be one (like the box world's random target), as a wall
+	can be moved into, just not out of. '''
+	open_boxes = [idx for idx in range(size) if graph.get_neighbour_costs(idx)]
+	pairs = []
+	if not open_boxes or size < 2:
+		return pairs
+	for k in range(count):
+		source_idx = rng.choice(open_boxes)
+		target_idx = rng.randrange(size - 1)
+		if target_idx >= source_idx:
+			target_idx += 1 # any box but the source
+		tree = SearchDijkstraTree(graph, source_idx, targets=[target_idx])
+		pairs.append((source_idx, target_idx, tree.dist.get(target_idx)))
+	return pairs
+
+def run_search(search, graph, pairs):
+	''' Run the search over all pairs. Returns (seconds, paths). '''
+	paths = []
+	start = perf_counter()
+	for source_idx, target_idx, best in pairs:
+		paths.append(search(graph, source_idx, target_idx))
+	return perf_counter() - start, paths
+
+def bench_world(name, world, count, rng):
+	''' Benchmark results (a list of dicts) for every search and profile. '''
+	results = []
+	size = len(world.boxes)
+	for speed in sorted(world.costTables):
+		agent = world.profileAgent(speed)
+		graph = world.navigationGraphs[agent.id]
+		pairs = random_pairs(graph, size, count, rng)
+		if not pairs:
+			continue
+		for mode, search in sorted(SEARCHES.items()):
+			searchGraph = world.navigationGrid(agent) if search in GRID_SEARCHES else graph
+			# first query on its own, as it includes any lazy set up
+			# (like the HPA* abstraction)
+			first, paths = run_search(search, searchGraph, pairs[:1])
+			seconds, paths = run_search(search, searchGraph, pairs)
+			# again, to measure the memory (tracemalloc slows it down)
+			tracemalloc.start()
+			run_search(search, searchGraph, pairs)
+			peak = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+
+			gaps, failed = [], 0
+			for (source_idx, target_idx, best), path in zip(pairs, paths):
+				if best is None:
+					failed += 1 if path.path else 0
+				elif not path.path:
+					failed += 1
+				else:
+					cost = world.navigationGrid(agent).path_cost(path.path)
+					gaps.append(cost / best - 1.0 if best > 0 else 0.0)
+			expansions = sum(path.steps for path in paths)
+			results.append({
+				'map': name,
+				'nx': world.numOfXBoxes,
+				'ny': world.numOfYBoxes,
+				'profile': speed,
+				'search': search.__name__[len('Search'):],
+				'mode': mode,
+				'pairs': len(pairs),
+				'expansions': expansions,
+				'mean_expansions': expansions / len(pairs),
+				'seconds': seconds,
+				'mean_ms': seconds * 1000.0 / len(pairs),
+				'first_ms': first * 1000.0,
+				'peak_kib': peak / 1024.0,
+				'mean_gap': sum(gaps) / len(gaps) if gaps else 0.0,
+				'max_gap': max(gaps) if gaps else 0.0,
+				'failed': failed,
+			})
+	return results
+
+def main(args=None):
+	parser = argparse.ArgumentParser(description='Benchmark the box world searches.')
+	parser.add_argument('--pairs', type=int, default=50, help='start/target pairs per map and profile')
+	parser.add_argument('--sizes', type=int, nargs='*', default=[100], help='sizes of the generated worlds')
+	parser.add_argument('--seed', type=int, default=1)
+	parser.add_argument('--out', help='JSON file to write (default: print it)')
+	args = parser.parse_args(args)
+
+	rng = random.Random(args.seed)
+	results = []
+	for filename in MAPS:
+		results += bench_world(filename, BoxWorld.FromFile(filename), args.pairs, rng)
+	for size in args.sizes:
+		results += bench_world('random%d' % size, random_world(size, rng), args.pairs, rng)
+
+	report = {'seed': args.seed, 'pairs': args.pairs, 'results': results}
+	if args.out:
+		with open(args.out, 'w') as f:
+			json.dump(report, f, indent=1)
+	else:
+		print(json.dumps(report, indent=1))
+
+if __name__ == '__main__':
+	main()
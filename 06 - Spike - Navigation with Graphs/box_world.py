@@ -1,14 +1,25 @@
 from math import hypot
+from array import array
 from enum import Enum
 from random import randint
+from time import perf_counter
 
-import pyglet
+import numpy as np
 
-from graphics import COLOUR_NAMES, window
 from point2d import Point2D
-from graph import SparseGraph, Node, Edge
-from searches import SearchAStar
+from graph import LayeredGraph
+from searches import SEARCHES, GRID_SEARCHES, SearchAStar, SearchJPS, SearchThetaStar
+from searches import SearchTask, PathTree, IterAStar, IterJPS, IterThetaStar, IterSearch, IterDijkstraTree
+from grid import BoxGrid, GridTopology
 from agent import Agent
+from path_table import NextHopTable
+from lpa_star import LPAStar
+from mt_astar import MTAdaptiveAStar
+from landmarks import Landmarks
+from planning_service import PlanningService
+from flow_field import FlowField
+from path_cache import PathCache
+from map_file import read_text_map, read_binary_map, write_binary_map
 
 BOX_TYPES = {
 	".":{"description":'CLEAR', "colour":"WHITE"},
@@ -19,6 +30,19 @@ BOX_TYPES = {
 	"X":{"description":'WALL', "colour":"GREY"},
 }
 
+# box types in tile code order, for the compact tile array of the box world
+TILE_CODES = list(BOX_TYPES.keys())
+# dict of {box type or description: tile code}, for reading maps
+TILE_LOOKUP = dict((boxType, code) for code, boxType in enumerate(TILE_CODES))
+TILE_LOOKUP.update((BOX_TYPES[boxType]["description"], code) for code, boxType in enumerate(TILE_CODES))
+
+# default size of the world, the same as the game window
+WORLD_WIDTH = 720
+WORLD_HEIGHT = 720
+
+# generator versions of the searches that can be run a slice at a time
+ITER_SEARCHES = {SearchAStar: IterAStar, SearchJPS: IterJPS, SearchThetaStar: IterThetaStar}
+
 MIN_EDGE_COST = 1.0 # must be min value for heuristic cost to work
 
 # def edge_cost(k1, k2):
@@ -29,7 +53,9 @@ MIN_EDGE_COST = 1.0 # must be min value for heuristic cost to work
 class Box(object):
 	'''A single box for boxworld. '''
 
-	def __init__(self, index, x, y, width, height, boxType='.'):
+	mapVersion = 0 # bumped by every setType, so cached paths can be checked
+
+	def __init__(self, index, x, y, width, height, boxType='.', pos=(0, 0)):
 		
 		self.x = x
 		self.y = y
@@ -40,33 +66,13 @@ class Box(object):
 		self.height = height
 		
 		self.boxType = boxType
-    
-		# a box must be able to draw:
-		# - a box with a grey outline and an (optional) filled colour
-		self.box = pyglet.shapes.BorderedRectangle(
-			x, y, width, height, border=1,
-			color=COLOUR_NAMES[BOX_TYPES[self.boxType]["colour"]], 
-			border_color=COLOUR_NAMES["LIGHT_GREY"],
-			batch=window.get_batch()
-		)
-		# - a label showing the box index
-		self.label = pyglet.text.Label(
-			str(index),
-			font_name='Times New Roman',
-			font_size=12,
-			x=x + width //2, y=y + height // 2,
-			anchor_x='center', anchor_y='center',
-			color=COLOUR_NAMES["BLACK"],
-			batch=window.get_batch("numbers")
-		)
-		
-		# nav graph node
-		self.node = None
+
+		self.pos = pos # (x, y) of the box in the grid of boxes
 
 	def setType(self, boxType):
+		Box.mapVersion += 1
 		if boxType in BOX_TYPES.keys():
 			self.boxType = boxType
-			self.box.color = COLOUR_NAMES[BOX_TYPES[self.boxType]["colour"]]
    
 			return
 
@@ -74,7 +80,6 @@ class Box(object):
 			for key, value in BOX_TYPES.items():
 				if value['description'] == boxType:
 					self.boxType = key
-					self.box.color = COLOUR_NAMES[BOX_TYPES[self.boxType]["colour"]]
      
 					return
                 
@@ -86,10 +91,50 @@ class Box(object):
 	def center(self):
 		return Point2D(self.x + self.width // 2, self.y + self.height // 2)
 
+class BoxList(object):
+	'''The boxes of a BoxWorld in box idx order, used like a list. A Box is
+	made from the tile array of the world the first time it is asked for, so
+	a big map loads without a Box per tile, and only the boxes in use (by
+	agents, edits or a renderer) take up memory. '''
+
+	def __init__(self, world, boxWidth, boxHeight):
+		self.world = world
+		self.boxWidth = boxWidth
+		self.boxHeight = boxHeight
+		self.made = {} # dict of {box idx: Box}
+
+	def __len__(self):
+		return len(self.world.tiles)
+
+	def __getitem__(self, idx):
+		if isinstance(idx, slice):
+			return [self[i] for i in range(*idx.indices(len(self)))]
+		box = self.made.get(idx)
+		if box is None:
+			box = self.makeBox(idx)
+		return box
+
+	def makeBox(self, idx):
+		if idx < 0:
+			idx += len(self)
+		if not 0 <= idx < len(self):
+			raise IndexError('box index out of range')
+		if idx not in self.made:
+			ix, iy = idx % self.world.numOfXBoxes, idx // self.world.numOfXBoxes
+			self.made[idx] = Box(index=idx, x=ix * self.boxWidth, y=iy * self.boxHeight, width=self.boxWidth, height=self.boxHeight,
+				boxType=TILE_CODES[self.world.tiles[idx]], pos=(ix, iy))
+		return self.made[idx]
+
+	def __iter__(self):
+		for idx in range(len(self)):
+			yield self[idx]
+
 class BoxWorld(object):
-	'''A world made up of boxes. '''
+	'''A world made up of boxes. It has no pyglet objects, so it can plan
+	paths without a window: renderers (see box_world_renderer) subscribe with
+	addListener and are told about each change. '''
 
-	def __init__(self, numOfXBoxes, numOfYBoxes, windowWidth, windowHeight):
+	def __init__(self, numOfXBoxes, numOfYBoxes, windowWidth, windowHeight, tiles=None):
   
 		self.numOfXBoxes = numOfXBoxes 
 		self.numOfYBoxes = numOfYBoxes 
@@ -100,9 +145,9 @@ class BoxWorld(object):
 		self.wx = (windowWidth - 1) // self.numOfXBoxes
 		self.wy = (windowHeight - 1) // self.numOfYBoxes 
   
-		self.boxes = [None] * numOfXBoxes * numOfYBoxes
-		for i in range(len(self.boxes)):
-			self.boxes[i] = Box(index=i, x=i % numOfXBoxes * boxWidth, y=i // numOfXBoxes % numOfYBoxes * boxHeight, width=boxWidth, height=boxHeight)
+		# tile code of each box, the map itself (boxes are made from it)
+		self.tiles = bytearray(tiles) if tiles is not None else bytearray(numOfXBoxes * numOfYBoxes)
+		self.boxes = BoxList(self, boxWidth, boxHeight)
    
 		self.target = None
 
@@ -116,28 +161,38 @@ class BoxWorld(object):
   
 		self.agents = [fast_hunter, slow_hunter, fast_prey, slow_prey]
 
-		self.navigationGraphs = {}
+		self.navigationGraphs = {} # dict of {agent.id: the graph of its profile}
+		self.profileGraphs = {} # dict of {speed: LayeredGraph}
+		self.reverseGraphs = {} # dict of {speed: reverse view}
+		self.pathTables = {}
+		self.planners = {} # dict of {agent.id: LPAStar}
+		self.plannerQueries = {} # dict of {agent.id: (start, target)} of the last A* query
+		self.chasers = {} # dict of {agent.id: MTAdaptiveAStar} of the hunters
+		self.chaseLimit = 500 # max expansions per chaser per tick (0 means none)
+		self.navigationGrids = {}
+		self.landmarks = {}
+		self.costTables = {} # dict of {speed: array of cost per tile code}
+		# the (index, distance) neighbours of each box, the topology shared
+		# by the navigation graphs of every profile
+		self.neighbours = GridTopology(numOfXBoxes, numOfYBoxes)
+		# paths being planned, dict of {agent.id: ([agent], SearchTask)}, or of
+		# {(speed, target): ([agents], SearchTask)} for a shared search
+		self.tasks = {}
+		self.limitTasks = {} # dict of {agent.id: (key, SearchTask)} to resume
+		self.planningService = None # worker processes, see useWorkers
+		self.serviceStale = True # grid snapshots need sending again
+		self.waiting = {} # dict of {agent.id: (agent, query)} sent to workers
+		self.flowFields = None # dict of {(speed, target idx): FlowField} if used
+		self.pathCache = PathCache()
 		self.paths = {}
+		# dict of {agent.id: [Path, {box idx: position} or None, position]}
+		# cursors of the agents along their paths, see stepAgent
+		self.cursors = {}
+		self.listeners = [] # renderers told about changes, see notify
+
+		# key into searches.SEARCHES of the search used to plan paths
+		self.searchMode = 1
 		
-		self.startMarkers = {}
-		for agent in self.agents:
-			self.startMarkers[agent.id] = pyglet.shapes.Box(
-				self.boxes[0].center().x - self.boxes[0].width,
-				self.boxes[0].center().y - self.boxes[0].height,
-				self.boxes[0].width, self.boxes[0].height,
-				color=COLOUR_NAMES[agent.colors["Start"]],
-				batch=window.get_batch("path"),
-				thickness=4
-			)
-		self.targetMarker = pyglet.shapes.Box(
-				self.boxes[1].center().x - self.boxes[0].width,
-				self.boxes[1].center().y - self.boxes[0].height,
-				self.boxes[0].width, self.boxes[0].height,
-				color=COLOUR_NAMES["GREEN"],
-				batch=window.get_batch("path"),
-    			thickness=4
-			)
-  
 		self.setStart(agent=self.agents[0], identificationX=0)
 		self.setStart(agent=self.agents[1], identificationX=1)
 		# self.setStart(agent=self.agents[1], identificationX=numOfXBoxes * (numOfYBoxes - 1))
@@ -148,20 +203,10 @@ class BoxWorld(object):
 			if subAgent.currentBox is None:
 				subAgent.currentBox = subAgent.startBox
     
-		self.currentMarkers = {}
-		for agent in self.agents:
-			self.currentMarkers[agent.id] = pyglet.shapes.Arc(
-				agent.currentBox.center().x,
-				agent.currentBox.center().y,
-				15 if agent.type == "PREY" else 20, segments=30,
-				color=COLOUR_NAMES[agent.colors["Start"]],
-				batch=window.get_batch("path"),
-				thickness=4
-			)
-
 		# Set target for the Preys
+		starts = [agent.startBox.index for agent in self.agents]
 		i = randint(1, numOfXBoxes * numOfYBoxes - 2)
-		while i == numOfXBoxes * (numOfYBoxes - 1) or i == numOfXBoxes - 1:
+		while i in starts:
 			i = randint(1, numOfXBoxes * numOfYBoxes - 2)
    
 		self.setTarget(identificationX=i)
@@ -171,18 +216,20 @@ class BoxWorld(object):
 		self.agents[0].targetBox = self.agents[3].currentBox
 		self.agents[1].targetBox = self.agents[2].currentBox
   
+		self.resetNavGraph()
 
+	def addListener(self, listener):
+		self.listeners.append(listener)
 
-		self.renderPaths = {}
-		self.renderTrees = {}
-		self.renderOpenNodes = {}
-		self.renderGraphs = {}
-
-		for subAgent in self.agents:
-			if subAgent.id not in self.renderPaths:
-				self.renderGraphs[subAgent.id] = []
-
-		self.resetNavGraph()
+	def notify(self, event, *args):
+		'''Call the event method (if it has one) of each listener. Events:
+		boxChanged(box), boxEdgesChanged(agent, i), navGraphReset(),
+		startChanged(agent), targetChanged(), agentMoved(agent),
+		agentsMoved(agents), pathsCleared() and pathChanged(agent). '''
+		for listener in self.listeners:
+			handler = getattr(listener, event, None)
+			if handler is not None:
+				handler(*args)
 
 	def getBoxByXY(self, ix, iy):
 		idx = (self.numOfXBoxes * iy) + ix
@@ -192,94 +239,164 @@ class BoxWorld(object):
 		idx = (self.numOfXBoxes * (y // self.wy)) + (x // self.wx)
 		return self.boxes[idx] if idx < len(self.boxes) else None   
    
-	def addEdge(self, agent, fromIdentificationX, toIdentificationX, cost, distance=1.0):
-		self.navigationGraphs[agent.id].add_edge(Edge(fromIdentificationX, toIdentificationX, cost * distance))
-
 	def _manhattan(self, idx1, idx2):
 		''' Manhattan distance between two nodes in boxworld, assuming the
 		minimal edge cost so that we don't overestimate the cost). '''
-		x1, y1 = self.boxes[idx1].pos
-		x2, y2 = self.boxes[idx2].pos
+		y1, x1 = divmod(idx1, self.numOfXBoxes)
+		y2, x2 = divmod(idx2, self.numOfXBoxes)
 		return (abs(x1-x2) + abs(y1-y2)) * MIN_EDGE_COST
 
 	def _hypot(self, idx1, idx2):
 		'''Return the straight line distance between two points on a 2-D
 		Cartesian plane. Argh, Pythagoras... trouble maker. '''
-		x1, y1 = self.boxes[idx1].pos
-		x2, y2 = self.boxes[idx2].pos
+		y1, x1 = divmod(idx1, self.numOfXBoxes)
+		y2, x2 = divmod(idx2, self.numOfXBoxes)
 		return hypot(x1-x2, y1-y2) * MIN_EDGE_COST
 
 	def _max(self, idx1, idx2):
 		'''Return the straight line distance between two points on a 2-D
 		Cartesian plane. Argh, Pythagoras... trouble maker. '''
-		x1, y1 = self.boxes[idx1].pos
-		x2, y2 = self.boxes[idx2].pos
+		y1, x1 = divmod(idx1, self.numOfXBoxes)
+		y2, x2 = divmod(idx2, self.numOfXBoxes)
 		return max(abs(x1-x2),abs(y1-y2)) * MIN_EDGE_COST
 
 	def resetNavGraph(self):
 		self.navigationGraphs = {}
+		self.profileGraphs = {}
+		self.reverseGraphs = {}
+		self.navigationGrids = {}
+		self.chasers = {}
+		self.limitTasks = {}
+		self.serviceStale = True
+		if self.flowFields is not None:
+			self.flowFields = {}
+		# one graph per traversal profile, shared by its agents
 		for agent in self.agents:
-			self.navigationGraphs[agent.id] = SparseGraph()
-            
-			# Set a heuristic cost function for the search to use
-            # self.navigationGraphs[agent.id].cost_h = self._manhattan
-			self.navigationGraphs[agent.id].cost_h = self._hypot
-			self.navigationGraphs[agent.id].cost_h = self._max
-
-			nx, ny = self.numOfXBoxes, self.numOfYBoxes
-			for i, box in enumerate(self.boxes):
-				box.pos = (i % nx, i // nx)
-				box.node = self.navigationGraphs[agent.id].add_node(Node(idx=i))
-                   
-			for i, box in enumerate(self.boxes):
-				traversalCost = agent.traversalCost[BOX_TYPES[box.boxType]["description"]]
-				if traversalCost != float("inf"):
-					# UP (i + nx)
-					if (i + nx) < len(self.boxes):
-						self.addEdge(agent=agent, fromIdentificationX=i, toIdentificationX=i + nx, cost=traversalCost)
-					# DOWN (i - nx)
-					if (i - nx) >= 0:
-						self.addEdge(agent=agent, fromIdentificationX=i, toIdentificationX=i - nx, cost=traversalCost)
-					# RIGHT (i + 1)
-					if (i % nx + 1) < nx:
-						self.addEdge(agent=agent, fromIdentificationX=i, toIdentificationX=i + 1, cost=traversalCost)
-					# LEFT (i - 1)
-					if (i % nx - 1) >= 0:
-					    self.addEdge(agent=agent, fromIdentificationX=i, toIdentificationX=i - 1, cost=traversalCost)
-					# UP LEFT (i + nx - 1)
-					j = i + nx
-					if (j - 1) < len(self.boxes) and (j % nx - 1) >= 0:
-					    self.addEdge(agent=agent, fromIdentificationX=i, toIdentificationX=j - 1, cost=traversalCost, distance=1.4142)
-					# UP RIGHT (i + nx + 1)
-					j = i + nx
-					if (j + 1) < len(self.boxes) and (j % nx + 1) < nx:
-					    self.addEdge(agent=agent, fromIdentificationX=i, toIdentificationX=j + 1, cost=traversalCost, distance=1.4142)
-					# DOWN LEFT (i - nx - 1)
-					j = i - nx
-					if (j - 1) >= 0 and (j % nx - 1) >= 0:
-					    self.addEdge(agent=agent, fromIdentificationX=i, toIdentificationX=j - 1, cost=traversalCost, distance=1.4142)
-					# DOWN RIGHT (i - nx + 1)
-					j = i - nx
-					if (j + 1) >= 0 and (j % nx + 1) < nx:
-					    self.addEdge(agent=agent, fromIdentificationX=i, toIdentificationX=j + 1, cost=traversalCost, distance=1.4142)
-                
-			for subAgent in self.agents:
-				if subAgent.id not in self.renderGraphs.keys():
-					self.renderGraphs[subAgent.id] = []
- 
-			for start, edge in self.navigationGraphs[agent.id].edgelist.items():
-				for target in edge.keys():
-					self.renderGraphs[agent.id].append(
-						pyglet.shapes.Line(
-							self.boxes[start].center().x, 
-							self.boxes[start].center().y,
-							self.boxes[target].center().x,
-							self.boxes[target].center().y,
-							width=0.5, 
-							color=COLOUR_NAMES['PURPLE'],
-							batch=window.get_batch("edges")
-						)
-					)
+			if agent.speed not in self.profileGraphs:
+				self.profileGraphs[agent.speed] = self.buildNavGraph(agent)
+			self.navigationGraphs[agent.id] = self.profileGraphs[agent.speed]
+
+		for speed, table in self.pathTables.items():
+			table.set_graph(self.navigationGraphs[self.profileAgent(speed).id])
+		if self.landmarks:
+			self.useLandmarks(count=list(self.landmarks.values())[0].count)
+		self.notify('navGraphReset')
+
+	def tileArray(self):
+		'''Return the tile codes as a (ny, nx) NumPy uint8 array. It is a view
+		of self.tiles, so there is no copy and it is always up to date. '''
+		return np.frombuffer(self.tiles, dtype=np.uint8).reshape(self.numOfYBoxes, self.numOfXBoxes)
+
+	def costTable(self, agent):
+		'''Return the traversal cost of each tile code (see TILE_CODES) for the
+		agent profile, as an array shared by all agents of the profile. '''
+		if agent.speed not in self.costTables:
+			self.costTables[agent.speed] = array('d', [agent.traversalCost[BOX_TYPES[boxType]["description"]] for boxType in TILE_CODES])
+		return self.costTables[agent.speed]
+
+	def boxCosts(self, agent):
+		'''Return the cost of leaving each box for the agent profile, as an
+		array('d'), looked up for all boxes at once with NumPy. '''
+		table = np.frombuffer(self.costTable(agent), dtype=np.float64)
+		return array('d', table[self.tileArray()].tobytes())
+
+	def buildNavGraph(self, agent):
+		'''Build the navigation graph of the agent traversal profile: the box
+		neighbours (shared by all profiles) plus a cost layer, the cost of
+		leaving each box (see boxCosts). So a profile only costs one array,
+		and agents of the same profile share its graph. '''
+		graph = LayeredGraph(self.neighbours, self.boxCosts(agent))
+		# Set a heuristic cost function for the search to use
+		# graph.cost_h = self._manhattan
+		# graph.cost_h = self._hypot
+		graph.cost_h = self._max
+		return graph
+
+	def updateBoxEdges(self, i):
+		'''Re-cost the edges leaving box i, with one write to the cost layer
+		of each profile graph (the reverse graphs are views of the same layer).
+		Returns a dict of {speed: [old neighbour idx]}. '''
+		self.tiles[i] = TILE_CODES.index(self.boxes[i].boxType)
+		oldNeighbours = {}
+		for speed, graph in self.profileGraphs.items():
+			agent = self.profileAgent(speed)
+			oldNeighbours[speed] = graph.get_neighbours(i)
+			graph.set_cost(i, self.costTable(agent)[self.tiles[i]])
+			self.notify('boxEdgesChanged', agent, i)
+
+		for grid in self.navigationGrids.values():
+			grid.box_changed(i)
+		return oldNeighbours
+
+	def profileAgent(self, speed):
+		'''Return the first agent with the given traversal profile. '''
+		for agent in self.agents:
+			if agent.speed == speed:
+				return agent
+		return None
+
+	def mapSignature(self, speed):
+		'''A string that changes whenever the map or the traversal costs of the
+		profile change, used to tell if saved path tables still match. '''
+		tiles = ''.join(TILE_CODES[tile] for tile in self.tiles)
+		costs = sorted(self.profileAgent(speed).traversalCost.items())
+		return '%d %d %s %s' % (self.numOfXBoxes, self.numOfYBoxes, tiles, costs)
+
+	def loadPathTables(self, filename):
+		'''Use an all-pairs next-hop table (one per traversal profile) for
+		unlimited path planning. Tables are read from "<map file>.<profile>.hops"
+		when they match the map, otherwise built and saved there. '''
+		for agent in self.agents:
+			if agent.speed in self.pathTables:
+				continue
+			table = NextHopTable(self.navigationGraphs[agent.id], len(self.boxes), self.mapSignature(agent.speed))
+			tableFile = '%s.%s.hops' % (filename, agent.speed)
+			if not table.load(tableFile):
+				table.build()
+				table.save(tableFile)
+			self.pathTables[agent.speed] = table
+
+	def useLandmarks(self, count=4):
+		'''Use ALT landmark heuristics (one set per traversal profile) as the
+		cost_h of the navigation graphs and grids, instead of a distance times
+		the minimum edge cost. The landmark distances are rebuilt lazily after
+		box edits. '''
+		self.landmarks = {}
+		self.limitTasks = {}
+		for agent in self.agents:
+			if agent.speed not in self.landmarks:
+				self.landmarks[agent.speed] = Landmarks(
+					self.navigationGraphs[agent.id], self.reverseGraph(agent), len(self.boxes),
+					count, base=self.navigationGrid(agent).cost_h
+				)
+			self.navigationGraphs[agent.id].cost_h = self.landmarks[agent.speed].cost_h
+			self.navigationGrid(agent).cost_h = self.landmarks[agent.speed].cost_h
+
+	def setBoxType(self, box, boxType):
+		'''Change a box type, re-cost its edges in the navigation graphs and
+		drop only the path table rows that the change can affect. Queued path
+		searches are started again on the new map. '''
+		box.setType(boxType)
+		self.notify('boxChanged', box)
+		oldNeighbours = self.updateBoxEdges(box.index)
+		for speed, table in self.pathTables.items():
+			table.box_changed(box.index, oldNeighbours[speed])
+		for landmarks in self.landmarks.values():
+			landmarks.box_changed(box.index)
+		self.limitTasks = {}
+		self.serviceStale = True
+		if self.flowFields is not None:
+			self.flowFields = {}
+		for agent in self.agents:
+			if agent.id in self.planners:
+				self.planners[agent.id].update_graph(self.navigationGraphs[agent.id], {box.index: oldNeighbours[agent.speed]})
+		for agentId, chaser in self.chasers.items():
+			chaser.update_graph(self.navigationGraphs[agentId])
+		# queued searches started on the old map, so start them again
+		queued = [agent for group, task in self.tasks.values() for agent in group]
+		self.tasks = {}
+		if queued:
+			self.queuePaths(queued)
      
 	def setStart(self, agent, identificationX):
 		'''Set the start box based on its index idx value. '''
@@ -288,8 +405,7 @@ class BoxWorld(object):
 			raise ValueError("Can't have the same start and target boxes!")
 		self.start = self.boxes[identificationX]
 		agent.startBox = self.start
-		self.startMarkers[agent.id].x = agent.startBox.center().x - self.boxes[0].width / 2
-		self.startMarkers[agent.id].y = agent.startBox.center().y - self.boxes[0].height / 2
+		self.notify('startChanged', agent)
   
 		self.agents[0].targetBox = self.agents[3].currentBox
 		self.agents[1].targetBox = self.agents[2].currentBox
@@ -306,84 +422,351 @@ class BoxWorld(object):
 		self.agents[2].targetBox = self.target
 		self.agents[3].targetBox = self.target
 
-		self.targetMarker.x = self.target.center().x - self.boxes[0].width / 2
-		self.targetMarker.y = self.target.center().y - self.boxes[0].height / 2
+		self.notify('targetChanged')
   
+	def useFlowFields(self):
+		'''Move the agents going to the world target (the prey) with a flow
+		field per traversal profile, instead of following their own paths. '''
+		self.flowFields = {}
+
+	def flowField(self, agent):
+		'''Return the FlowField to the agent target for the agent traversal
+		profile, built on first use and kept until the next box edit. '''
+		key = (agent.speed, agent.targetBox.index)
+		if key not in self.flowFields:
+			profileAgent = self.profileAgent(agent.speed)
+			self.flowFields[key] = FlowField(self.reverseGraph(profileAgent), self.profileGraphs[agent.speed].costs,
+				self.numOfXBoxes, self.numOfYBoxes, agent.targetBox.index)
+		return self.flowFields[key]
+
 	def moveAgent(self, agent):
-		if self.paths[agent.id] is None:
+		if self.stepAgent(agent):
+			self.notify('agentMoved', agent)
+
+	def moveAgents(self, agents):
+		'''Move all the agents one step, then tell the listeners about all of
+		them at once. Agents moving with the same flow field are a crowd,
+		stepped together with one NumPy lookup (see FlowField.next_boxes).
+		The others step along their own paths. Returns the number of agents
+		that moved. '''
+		moved = []
+		crowds = {} # dict of {(speed, target idx): [agents]} on flow fields
+		for agent in agents:
+			if self.flowFields is not None and agent.targetBox is self.target:
+				crowds.setdefault((agent.speed, agent.targetBox.index), []).append(agent)
+			elif self.stepAgent(agent):
+				moved.append(agent)
+		for crowd in crowds.values():
+			field = self.flowField(crowd[0])
+			nextBoxes = field.next_boxes([agent.currentBox.index for agent in crowd])
+			for agent, nextIdentificationX in zip(crowd, nextBoxes):
+				if nextIdentificationX >= 0:
+					agent.currentBox = self.boxes[nextIdentificationX]
+					moved.append(agent)
+		if moved:
+			self.notify('agentsMoved', moved)
+		return len(moved)
+
+	def stepAgent(self, agent):
+		'''Move the agent to the next box of its flow field or path, without
+		telling the listeners. Each agent keeps a cursor (its position) along
+		its path, so a move is O(1). The path is only searched for the agent
+		box (through a box idx to position map, made once per path) when the
+		agent is not where the cursor says. Returns True if the agent moved. '''
+		if self.flowFields is not None and agent.targetBox is self.target:
+			nextIdentificationX = self.flowField(agent).next_box(agent.currentBox.index)
+			if nextIdentificationX < 0:
+				return False
+			agent.currentBox = self.boxes[nextIdentificationX]
+			return True
+
+		if self.paths.get(agent.id) is None:
 			self.planPath(agent=agent, limit=0)
-   
-		route = [self.boxes[index] for index in self.paths[agent.id].path]
 
-		for i in range(0, len(route) - 1):
-			if route[i].center().x == agent.currentBox.center().x and route[i].center().y == agent.currentBox.center().y:
-				agent.currentBox = route[i + 1]
-
-				self.currentMarkers[agent.id].x = agent.currentBox.center().x
-				self.currentMarkers[agent.id].y = agent.currentBox.center().y
-    
-				break
+		path = self.paths[agent.id]
+		cursor = self.cursors.get(agent.id)
+		if cursor is None or cursor[0] is not path:
+			cursor = [path, None, 0]
+			self.cursors[agent.id] = cursor
+		route = path.path
+		position = cursor[2]
+		if position >= len(route) or route[position] != agent.currentBox.index:
+			if cursor[1] is None:
+				cursor[1] = {}
+				for i, identificationX in enumerate(route):
+					cursor[1].setdefault(identificationX, i)
+			position = cursor[1].get(agent.currentBox.index)
+			if position is None:
+				return False # not on the path
+		if position + 1 >= len(route):
+			cursor[2] = position
+			return False # at the end
+		cursor[2] = position + 1
+		agent.currentBox = self.boxes[route[position + 1]]
+		return True
 
 	def resetAgent(self, agent):
 		agent.currentBox = agent.startBox
-  
-		self.currentMarkers[agent.id].x = agent.currentBox.center().x
-		self.currentMarkers[agent.id].y = agent.currentBox.center().y
+		self.notify('agentMoved', agent)
 
 	def planPath(self, agent, limit):
-		for subAgent in self.agents:
-			self.renderPaths[subAgent.id] = []
+		self.notify('pathsCleared')
    
 		self.resetAgent(agent)
 
-		self.paths[agent.id] = SearchAStar(self.navigationGraphs[agent.id], agent.startBox.index, agent.targetBox.index, limit)
+		self.paths[agent.id] = self.searchPath(agent, agent.targetBox.index, limit)
 		
 		# print(self.paths[agent.id].report())
 
-		p = self.paths[agent.id].path 
-		if len(p) > 1:
-			for identificationX in range(len(p) - 1):
-				self.renderPaths[agent.id].append(
-					pyglet.shapes.Line(
-						self.boxes[p[identificationX]].center().x, 
-						self.boxes[p[identificationX]].center().y,
-						self.boxes[p[identificationX + 1]].center().x,
-						self.boxes[p[identificationX + 1]].center().y,
-						width=3, 
-						color=COLOUR_NAMES[agent.colors["Path"]],
-						batch=window.get_batch("path")
-					)
-				)
+		self.notify('pathChanged', agent)
+
+	def chaseTargets(self, agents):
+		'''Replan the paths of agents chasing a moving target (the hunters)
+		from where they are now. Each has an MT-Adaptive A* planner that learns
+		from its earlier searches, so replanning every tick stays cheap, and
+		at most chaseLimit nodes are expanded per agent, so a tick costs about
+		the same however far away the target is. '''
+		for agent in agents:
+			chaser = self.chasers.get(agent.id)
+			if chaser is None:
+				chaser = MTAdaptiveAStar(self.navigationGraphs[agent.id])
+				self.chasers[agent.id] = chaser
+			self.paths[agent.id] = chaser.search(agent.currentBox.index, agent.targetBox.index, self.chaseLimit)
+			self.notify('pathChanged', agent)
+
+	def planPaths(self, agents, limit):
+		'''Plan paths for several agents. Agents with the same traversal costs
+		and the same target share one reverse Dijkstra search from the target
+		instead of running one A* search each. '''
+		for targetIdentificationX, group, shared in self.groupAgents(agents):
+			# a step limit only makes sense for the single agent searches
+			if not shared or limit > 0:
+				for agent in group:
+					self.resetAgent(agent)
+					self.paths[agent.id] = self.searchPath(agent, targetIdentificationX, limit)
+					self.notify('pathChanged', agent)
+				continue
+
+			graph = self.navigationGraphs[group[0].id]
+			tree = self.groupTask(group, targetIdentificationX).run()
+			for agent in group:
+				self.resetAgent(agent)
+				self.paths[agent.id] = tree.get_path(graph, agent.startBox.index)
+				self.notify('pathChanged', agent)
+
+	def groupAgents(self, agents):
+		'''Group the agents by traversal profile and target. Returns a list of
+		(target idx, [agents], shared) items. shared is True if the group can
+		share one reverse Dijkstra search from the target (see groupTask): it
+		has more than one agent, the search mode is A* and the profile has no
+		path table. '''
+		groups = {}
+		for agent in agents:
+			groups.setdefault((agent.speed, agent.targetBox.index), []).append(agent)
+		shareable = SEARCHES[self.searchMode] is SearchAStar
+		return [(targetIdentificationX, group, shareable and len(group) > 1 and speed not in self.pathTables)
+			for (speed, targetIdentificationX), group in groups.items()]
+
+	def groupTask(self, group, targetIdentificationX):
+		'''SearchTask of the reverse Dijkstra search from the target shared by
+		the group agents. Its result is a PathTree with all their paths. '''
+		return SearchTask(IterDijkstraTree(
+			self.reverseGraph(group[0]), targetIdentificationX,
+			targets=[agent.startBox.index for agent in group], reverse=True
+		))
+
+	def searchPath(self, agent, targetIdentificationX, limit):
+		'''Path from the agent start box. Limited A*, JPS and Theta* searches
+		are kept and resumed when the limit goes up, instead of searching again
+		from scratch. They run on the same graph as the unlimited searches (see
+		searchTask), so a high enough limit gives the same search. Unlimited
+		searches run the whole searchTask at once. '''
+		search = SEARCHES[self.searchMode]
+		if limit > 0 and search in ITER_SEARCHES:
+			key = (self.searchMode, agent.startBox.index, targetIdentificationX)
+			cached = self.limitTasks.get(agent.id)
+			if cached is None or cached[0] != key or cached[1].steps > limit:
+				iterSearch = ITER_SEARCHES[search]
+				graph = self.navigationGraphs[agent.id] if search is SearchAStar else self.navigationGrid(agent)
+				cached = (key, SearchTask(iterSearch(graph, agent.startBox.index, targetIdentificationX)))
+				self.limitTasks[agent.id] = cached
+			task = cached[1]
+			if task.steps == limit:
+				return task.result()
+			return task.run(steps=limit - task.steps)
+		if limit > 0 and search in GRID_SEARCHES:
+			return search(self.navigationGrid(agent), agent.startBox.index, targetIdentificationX, limit)
+		if limit > 0:
+			return search(self.navigationGraphs[agent.id], agent.startBox.index, targetIdentificationX, limit)
+		path = self.cachedPath(agent, targetIdentificationX)
+		if path is None:
+			path = self.searchTask(agent, targetIdentificationX).run()
+			self.cachePath(agent, targetIdentificationX, path)
+		return path
+
+	def cachedPath(self, agent, targetIdentificationX):
+		'''Full path from the agent start box out of the path cache (maybe
+		the end of a cached path that goes through the start box), or None. '''
+		profile = (agent.speed, self.searchMode)
+		return self.pathCache.get(profile, agent.startBox.index, targetIdentificationX, Box.mapVersion)
+
+	def cachePath(self, agent, targetIdentificationX, path):
+		profile = (agent.speed, self.searchMode)
+		self.pathCache.put(profile, agent.startBox.index, targetIdentificationX, Box.mapVersion, path)
+
+	def searchTask(self, agent, targetIdentificationX):
+		'''SearchTask for the full path from the agent start box, read from the
+		path table if there is one for the agent profile, otherwise found with
+		A*. A query planned again (after box edits, as the path cache has it
+		until then) gets an LPA* planner, which keeps its search state, so
+		after more edits only the affected part is searched again. Searches
+		other than A* run from scratch (on the implicit grid where they can). '''
+		search = SEARCHES[self.searchMode]
+		start = agent.startBox.index
+		if search in (SearchJPS, SearchThetaStar):
+			return SearchTask(ITER_SEARCHES[search](self.navigationGrid(agent), start, targetIdentificationX))
+		if search in GRID_SEARCHES:
+			return SearchTask(IterSearch(search, self.navigationGrid(agent), start, targetIdentificationX))
+		if search is not SearchAStar:
+			return SearchTask(IterSearch(search, self.navigationGraphs[agent.id], start, targetIdentificationX))
+		if agent.speed in self.pathTables:
+			return SearchTask(IterSearch(self.pathTables[agent.speed].get_path, start, targetIdentificationX))
+		query = (start, targetIdentificationX)
+		planner = self.planners.get(agent.id)
+		if planner is None or (planner.source_idx, planner.target_idx) != query:
+			self.planners.pop(agent.id, None)
+			if self.plannerQueries.get(agent.id) != query:
+				# a new query, a planner only pays off if it is asked again
+				self.plannerQueries[agent.id] = query
+				return SearchTask(IterAStar(self.navigationGraphs[agent.id], start, targetIdentificationX))
+			planner = LPAStar(self.navigationGraphs[agent.id], start, targetIdentificationX, self.reverseGraph(agent))
+			self.planners[agent.id] = planner
+		return SearchTask(planner.iter_compute())
+
+	def queuePaths(self, agents):
+		'''Start planning full paths for the agents, to be done a slice at a
+		time by stepPaths. Agents keep their old path until the new one is
+		ready. Like planPaths, agents with the same traversal costs and target
+		share one reverse Dijkstra search from the target. '''
+		uncached = []
+		for agent in agents:
+			self.dropTask(agent)
+			path = self.cachedPath(agent, agent.targetBox.index)
+			if path is not None:
+				self.resetAgent(agent)
+				self.paths[agent.id] = path
+				self.notify('pathChanged', agent)
+			else:
+				uncached.append(agent)
+
+		for targetIdentificationX, group, shared in self.groupAgents(uncached):
+			if not shared:
+				for agent in group:
+					self.tasks[agent.id] = ([agent], self.searchTask(agent, targetIdentificationX))
+				continue
+			self.tasks[(group[0].speed, targetIdentificationX)] = (group, self.groupTask(group, targetIdentificationX))
+
+	def dropTask(self, agent):
+		'''Stop planning a path for the agent. Agents sharing its search go on. '''
+		for key, (group, task) in list(self.tasks.items()):
+			if agent in group:
+				group.remove(agent)
+				if not group:
+					del self.tasks[key]
+
+	def useWorkers(self, workers=None):
+		'''Plan full A* paths on a pool of worker processes (one per CPU by
+		default), see submitPaths and collectPaths. '''
+		self.planningService = PlanningService(workers)
+		self.serviceStale = True
+
+	def stopWorkers(self):
+		'''Shut down the worker processes (if any), e.g. when the game ends.
+		Paths still being planned on them are dropped. '''
+		if self.planningService is not None:
+			self.planningService.shutdown()
+			self.planningService = None
+			self.waiting = {}
+
+	def submitPaths(self, agents):
+		'''Send the agent path queries to the worker processes. Agents with
+		the same profile, start and target share one query. After box edits
+		the workers get new grid snapshots, and queries still waiting are sent
+		again. '''
+		for agent in agents:
+			self.waiting[agent.id] = (agent, (agent.speed, agent.startBox.index, agent.targetBox.index))
+		queries = [query for agent, query in self.waiting.values()]
+		if self.serviceStale:
+			for speed in self.profileGraphs:
+				self.planningService.set_graph(speed, self.navigationGrid(self.profileAgent(speed)).snapshot())
+			self.serviceStale = False
+		self.planningService.submit(queries)
+
+	def collectPaths(self):
+		'''Use (and render) the paths the workers have finished. Returns the
+		number of agents still waiting. '''
+		results = self.planningService.poll()
+		for agentId, (agent, query) in list(self.waiting.items()):
+			if query in results:
+				del self.waiting[agentId]
+				self.resetAgent(agent)
+				self.paths[agent.id] = results[query]
+				self.notify('pathChanged', agent)
+		return len(self.waiting)
+
+	def stepPaths(self, seconds):
+		'''Spend up to seconds planning the queued paths (in queue order), and
+		use (and render) each path as it is finished. Returns the number of
+		searches still going. '''
+		deadline = perf_counter() + seconds
+		for key in list(self.tasks.keys()):
+			remaining = deadline - perf_counter()
+			if remaining <= 0:
+				break
+			group, task = self.tasks[key]
+			result = task.run(seconds=remaining)
+			if task.done:
+				del self.tasks[key]
+				for agent in group:
+					if isinstance(result, PathTree):
+						path = result.get_path(self.navigationGraphs[agent.id], agent.startBox.index)
+					else:
+						path = result
+					self.cachePath(agent, agent.targetBox.index, path)
+					self.resetAgent(agent)
+					self.paths[agent.id] = path
+					self.notify('pathChanged', agent)
+		return len(self.tasks)
+
+	def navigationGrid(self, agent):
+		'''Return the BoxGrid (implicit graph, no Node or Edge objects) of the
+		agent traversal profile, built on first use. It reads the shared tile
+		array through a cost table of the profile, so box edits only need to
+		update self.tiles. Agents with the same profile share it. '''
+		if agent.speed not in self.navigationGrids:
+			minCost = min(cost for cost in agent.traversalCost.values())
+			self.navigationGrids[agent.speed] = BoxGrid(self.numOfXBoxes, self.numOfYBoxes, self.tiles, self.costTable(agent), minCost)
+		return self.navigationGrids[agent.speed]
+
+	def reverseGraph(self, agent):
+		'''Return the agent navigation graph with all edges flipped, a view
+		that shares the cost layer of the profile, so it needs no updates. '''
+		if agent.speed not in self.reverseGraphs:
+			self.reverseGraphs[agent.speed] = self.navigationGraphs[agent.id].reverse()
+		return self.reverseGraphs[agent.speed]
+
+	def saveMap(self, filename):
+		'''Save the map in the binary format (see map_file). '''
+		write_binary_map(filename, self.numOfXBoxes, self.numOfYBoxes, self.tiles)
 
 	@classmethod
-	def FromFile(cls, filename):
-		'''Support a the construction of a BoxWorld map from a simple text file.
-		See the module doc details at the top of this file for format details.
+	def FromFile(cls, filename, width=WORLD_WIDTH, height=WORLD_HEIGHT):
+		'''Support a the construction of a BoxWorld map from a simple text file
+		(read a line at a time), or from a binary map file (".bxw", see
+		saveMap). The boxes are sized to fill width x height (the window size).
 		'''
-		# open and read the file
-		f = open(filename)
-		lines = []
-		for line in f.readlines():
-			line = line.strip()
-			if line and not line.startswith('#'):
-				lines.append(line)
-		f.close()
-		# first line is the number of boxes width, height
-		nx, ny = [int(bit) for bit in lines.pop(0).split()]
-		# Create a new BoxWorld to store all the new boxes in...
-		world = BoxWorld(nx, ny, window.width, window.height)
-  
-		# Ready to process each line
-		assert len(lines) == ny, "Number of rows doesn't match data."
-		# Eead each line
-		idx = 0
-		for line in reversed(lines): # in reverse order
-			bits = line.split()
-			assert len(bits) == nx, "Number of columns doesn't match data."
-			for bit in bits:
-				bit = bit.strip()
-				world.boxes[idx].setType(bit)
-				idx += 1
-		world.resetNavGraph()
-  
-		return world
\ No newline at end of file
+		if filename.endswith('.bxw'):
+			nx, ny, tiles = read_binary_map(filename)
+			return BoxWorld(nx, ny, width, height, tiles)
+		nx, ny, tiles = read_text_map(filename, TILE_LOOKUP)
+		return BoxWorld(nx, ny, width, height, tiles)
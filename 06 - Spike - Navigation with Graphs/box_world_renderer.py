@@ -0,0 +1,154 @@
+import pyglet
+
+from graphics import COLOUR_NAMES, window
+from box_world import BOX_TYPES
+
+class BoxWorldRenderer(object):
+	'''Draws a BoxWorld in the game window. The world itself has no pyglet
+	objects: the renderer subscribes to its change events and keeps its own
+	shapes, labels, markers and lines up to date. '''
+
+	def __init__(self, world):
+		self.world = world
+
+		first = world.boxes[0]
+		self.boxes = []
+		self.labels = []
+		for box in world.boxes:
+			# a box with a grey outline and an (optional) filled colour
+			self.boxes.append(pyglet.shapes.BorderedRectangle(
+				box.x, box.y, box.width, box.height, border=1,
+				color=COLOUR_NAMES[BOX_TYPES[box.boxType]["colour"]],
+				border_color=COLOUR_NAMES["LIGHT_GREY"],
+				batch=window.get_batch()
+			))
+			# a label showing the box index
+			self.labels.append(pyglet.text.Label(
+				str(box.index),
+				font_name='Times New Roman',
+				font_size=12,
+				x=box.x + box.width // 2, y=box.y + box.height // 2,
+				anchor_x='center', anchor_y='center',
+				color=COLOUR_NAMES["BLACK"],
+				batch=window.get_batch("numbers")
+			))
+
+		self.startMarkers = {}
+		self.currentMarkers = {}
+		for agent in world.agents:
+			self.startMarkers[agent.id] = pyglet.shapes.Box(
+				0, 0, first.width, first.height,
+				color=COLOUR_NAMES[agent.colors["Start"]],
+				batch=window.get_batch("path"),
+				thickness=4
+			)
+			self.currentMarkers[agent.id] = pyglet.shapes.Arc(
+				0, 0, 15 if agent.type == "PREY" else 20, segments=30,
+				color=COLOUR_NAMES[agent.colors["Start"]],
+				batch=window.get_batch("path"),
+				thickness=4
+			)
+			self.startChanged(agent)
+			self.agentMoved(agent)
+		self.targetMarker = pyglet.shapes.Box(
+			0, 0, first.width, first.height,
+			color=COLOUR_NAMES["GREEN"],
+			batch=window.get_batch("path"),
+			thickness=4
+		)
+		self.targetChanged()
+
+		self.renderGraphs = {} # dict of {speed: {(i, j): Line}}
+		self.renderPaths = {} # dict of {agent.id: [Line]}
+		self.navGraphReset()
+		for agent in world.agents:
+			if world.paths.get(agent.id) is not None:
+				self.pathChanged(agent)
+
+		world.addListener(self)
+
+	def boxChanged(self, box):
+		self.boxes[box.index].color = COLOUR_NAMES[BOX_TYPES[box.boxType]["colour"]]
+
+	def navGraphReset(self):
+		'''Colour every box and remake all the edge lines. '''
+		for box in self.world.boxes:
+			self.boxChanged(box)
+		for lines in self.renderGraphs.values():
+			# drop the old graph lines, rather than keep them all alive
+			for line in lines.values():
+				try:
+					line.delete() #pyglets Line.delete method is slightly broken
+				except:
+					pass
+		self.renderGraphs = {}
+		# one set of lines per traversal profile, as agents share its graph
+		for speed in self.world.profileGraphs:
+			agent = self.world.profileAgent(speed)
+			self.renderGraphs[speed] = {}
+			for i in range(len(self.world.boxes)):
+				self.boxEdgesChanged(agent, i)
+
+	def boxEdgesChanged(self, agent, i):
+		'''Make the render lines for the edges leaving box i match the graph,
+		reusing the lines of edges that are still there. '''
+		boxes = self.world.boxes
+		lines = self.renderGraphs[agent.speed]
+		edges = self.world.navigationGraphs[agent.id].get_neighbours(i)
+		for j, distance in self.world.neighbours[i]:
+			if j in edges and (i, j) not in lines:
+				lines[(i, j)] = pyglet.shapes.Line(
+					boxes[i].center().x,
+					boxes[i].center().y,
+					boxes[j].center().x,
+					boxes[j].center().y,
+					width=0.5,
+					color=COLOUR_NAMES['PURPLE'],
+					batch=window.get_batch("edges")
+				)
+			elif j not in edges and (i, j) in lines:
+				try:
+					lines.pop((i, j)).delete() #pyglets Line.delete method is slightly broken
+				except:
+					pass
+
+	def startChanged(self, agent):
+		first = self.world.boxes[0]
+		self.startMarkers[agent.id].x = agent.startBox.center().x - first.width / 2
+		self.startMarkers[agent.id].y = agent.startBox.center().y - first.height / 2
+
+	def targetChanged(self):
+		first = self.world.boxes[0]
+		self.targetMarker.x = self.world.target.center().x - first.width / 2
+		self.targetMarker.y = self.world.target.center().y - first.height / 2
+
+	def agentMoved(self, agent):
+		self.currentMarkers[agent.id].x = agent.currentBox.center().x
+		self.currentMarkers[agent.id].y = agent.currentBox.center().y
+
+	def agentsMoved(self, agents):
+		for agent in agents:
+			self.agentMoved(agent)
+
+	def pathsCleared(self):
+		for agent in self.world.agents:
+			self.renderPaths[agent.id] = []
+
+	def pathChanged(self, agent):
+		boxes = self.world.boxes
+		self.renderPaths[agent.id] = []
+
+		p = self.world.paths[agent.id].path
+		if len(p) > 1:
+			for identificationX in range(len(p) - 1):
+				self.renderPaths[agent.id].append(
+					pyglet.shapes.Line(
+						boxes[p[identificationX]].center().x,
+						boxes[p[identificationX]].center().y,
+						boxes[p[identificationX + 1]].center().x,
+						boxes[p[identificationX + 1]].center().y,
+						width=3,
+						color=COLOUR_NAMES[agent.colors["Path"]],
+						batch=window.get_batch("path")
+					)
+				)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from searches import SearchDijkstraTree
+from grid import MOVES
+
+INF = float('inf')
+
+class FlowField(object):
+	''' Flow field towards one target box, for one traversal profile.
+
+	The integration field (dist) holds the cost of the best path from every
+	box to the target, found with one reverse Dijkstra search from the target.
+	The flow (hops, plus the dx, dy direction of each) is the next box to step
+	to from every box, picked for all boxes at once with NumPy: the move with
+	the lowest move cost plus integration value of the box it goes to. Any
+	number of agents going to the target then only need one lookup per move,
+	with no path of their own (or one lookup for all of them, see
+	next_boxes). Boxes that can't reach the target have hops -1 and
+	direction (0, 0).
+	'''
+
+	def __init__(self, reverse, costs, nx, ny, target_idx):
+		''' reverse is the reversed navigation graph of the profile and costs
+		the cost of leaving each box (as for a LayeredGraph). '''
+		self.nx = nx
+		self.ny = ny
+		self.target_idx = target_idx
+		tree = SearchDijkstraTree(reverse, target_idx, reverse=True)
+		dist = np.full(nx * ny, INF) # integration field
+		dist[np.fromiter(tree.dist.keys(), dtype=np.int64, count=len(tree.dist))] = \
+			np.fromiter(tree.dist.values(), dtype=np.float64, count=len(tree.dist))
+		self.dist = dist
+
+		# the cost to the target through each of the moves out of every box,
+		# one (ny, nx) plane per move, read from the shifted integration field
+		field = np.full((ny + 2, nx + 2), INF) # with a border of inf
+		field[1:-1, 1:-1] = dist.reshape(ny, nx)
+		leave = np.asarray(costs, dtype=np.float64).reshape(ny, nx)
+		planes = np.empty((len(MOVES), ny, nx))
+		for k, (dx, dy, distance) in enumerate(MOVES):
+			planes[k] = leave * distance + field[1 + dy:1 + dy + ny, 1 + dx:1 + dx + nx]
+		best = planes.argmin(axis=0).ravel()
+		reachable = np.isfinite(planes.min(axis=0).ravel())
+		reachable[target_idx] = False # nowhere to go from the target
+
+		dxs = np.array([dx for dx, dy, distance in MOVES], dtype=np.int8)
+		dys = np.array([dy for dx, dy, distance in MOVES], dtype=np.int8)
+		steps = np.array([dy * nx + dx for dx, dy, distance in MOVES], dtype=np.int64)
+		self.dx = np.where(reachable, dxs[best], 0).astype(np.int8) # direction of the next box
+		self.dy = np.where(reachable, dys[best], 0).astype(np.int8)
+		self.hops = np.where(reachable, np.arange(nx * ny) + steps[best], -1) # next box idx, -1 if none
+
+	def next_box(self, idx):
+		''' The box to step to from box idx (idx itself at the target, or -1
+		if the target can't be reached). '''
+		if idx == self.target_idx:
+			return idx
+		return int(self.hops[idx])
+
+	def next_boxes(self, idxs):
+		''' next_box for a whole list of boxes in one NumPy step. Returns a
+		list of box idx values. '''
+		idxs = np.asarray(idxs, dtype=np.int64)
+		return np.where(idxs == self.target_idx, idxs, self.hops[idxs]).tolist()
+
+	def direction(self, idx):
+		''' (dx, dy) step from box idx towards the target. '''
+		return (int(self.dx[idx]), int(self.dy[idx]))
+
+	def cost(self, idx):
+		''' Cost of the best path from box idx to the target. '''
+		return float(self.dist[idx])
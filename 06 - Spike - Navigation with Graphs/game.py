@@ -4,6 +4,8 @@ from enum import Enum
 
 import pyglet
 from box_world import BoxWorld
+from box_world_renderer import BoxWorldRenderer
+from searches import SEARCHES, SearchAStar
 from graphics import window
 
 # Mouse mode indicates what the mouse "click" should do...
@@ -18,9 +20,18 @@ class MouseModes(Enum):
 	TARGET = 	pyglet.window.key._8
 
 class Game():
-	def __init__(self, map):
+	def __init__(self, map, usePathTables=False, useLandmarks=False, workers=0, useFlowFields=False):
      
-		self.world = BoxWorld.FromFile(map)
+		self.world = BoxWorld.FromFile(map, window.width, window.height)
+		if usePathTables:
+			self.world.loadPathTables(map)
+		if useLandmarks:
+			self.world.useLandmarks()
+		if workers:
+			self.world.useWorkers(workers if workers > 0 else None)
+		if useFlowFields:
+			self.world.useFlowFields()
+		self.renderer = BoxWorldRenderer(self.world)
   
 		self.currentAgent = self.world.agents[0]
 		self.agent_type = 0
@@ -28,12 +39,16 @@ class Game():
 		self.mouseMode = MouseModes.MUD
 		window._update_label('mouse', 'Click to place: '+ self.mouseMode.name)
 
-		window._update_label('search', 'Search Type: A*')
+		self.updateSearchDisplay()
   
 		# Search limit
 		# (0 means unlimited)
 		self.searchLimit = 0
 		self.updateLimitDisplay()
+
+		# Seconds of path planning per frame, so that planning for many agents
+		# is spread over frames (0 means plan at once)
+		self.planBudget = 0.004
   
 		window._update_label('status', 'Status: Loaded')
 
@@ -41,25 +56,48 @@ class Game():
 
 	
 	def planPath(self):
-		for a in self.world.agents:
-			self.world.planPath(agent=a, limit=self.searchLimit)
+		if self.searchLimit == 0 and self.world.planningService and SEARCHES[self.world.searchMode] is SearchAStar:
+			self.world.submitPaths(agents=self.world.agents)
+			window._update_label('status', 'Status: Planning...')
+			return
+		if self.searchLimit == 0 and self.planBudget > 0:
+			self.world.queuePaths(agents=self.world.agents)
+			window._update_label('status', 'Status: Planning...')
+			return
+		self.world.planPaths(agents=self.world.agents, limit=self.searchLimit)
 		# self.world.planPath(agent=self.currentAgent, limit=self.searchLimit)
 		window._update_label('status', 'Status: Path Planned')
+
+	def update(self, dt):
+		'''Called every frame: go on with any queued path planning. '''
+		if self.world.tasks:
+			if self.world.stepPaths(self.planBudget) == 0:
+				window._update_label('status', 'Status: Path Planned')
+		if self.world.waiting:
+			if self.world.collectPaths() == 0:
+				window._update_label('status', 'Status: Path Planned')
 		
+	def close(self):
+		'''Called as the window closes: stop any worker processes. '''
+		self.world.stopWorkers()
+
 	def planPath_for_choosen_agent(self):
 		self.world.planPath(agent=self.currentAgent, limit=self.searchLimit)
 		window._update_label('status', 'Status: Path Planned')
 
 	def moveAgent(self):
-		for a in self.world.agents:
-			self.world.agents[0].targetBox = self.world.agents[3].currentBox
-			self.world.agents[1].targetBox = self.world.agents[2].currentBox
-			# self.world.planPath(agent=a, limit=self.searchLimit)
+		self.world.agents[0].targetBox = self.world.agents[3].currentBox
+		self.world.agents[1].targetBox = self.world.agents[2].currentBox
+		# the hunters replan towards where their prey is now
+		self.world.chaseTargets(agents=[a for a in self.world.agents if a.type == "HUNTER"])
 
-			self.world.moveAgent(agent=a)
+		self.world.moveAgents(agents=self.world.agents)
 
 		# self.world.moveAgent(agent=self.currentAgent)
   
+	def updateSearchDisplay(self):
+		window._update_label('search', 'Search Type: ' + SEARCHES[self.world.searchMode].__name__[len('Search'):])
+
 	def updateLimitDisplay(self):
 		if (self.searchLimit >= 1):
 			window._update_label('limit', 'Limit: %d' % self.searchLimit)
@@ -70,13 +108,12 @@ class Game():
 		box = self.world.getBoxByPos(x, y)
 		if box:
 			if self.mouseMode == MouseModes.START:
-				self.world.setStart(self.world.agents[self.agent_type],box.node.idx)
+				self.world.setStart(self.world.agents[self.agent_type],box.index)
 			elif self.mouseMode == MouseModes.TARGET:
-				self.world.setTarget(box.node.idx)
+				self.world.setTarget(box.index)
 				# self.planPath()
 			else:
-				box.setType(self.mouseMode.name)
-			self.world.resetNavGraph()
+				self.world.setBoxType(box, self.mouseMode.name)
 			self.planPath()
 			self.world.resetAgent(agent=self.currentAgent)
 			window._update_label('status','Status: Graph Changed')
@@ -105,6 +142,16 @@ class Game():
 				self.world.resetAgent(agent=self.currentAgent)
 				self.planPath()
     
+		# Change search mode? (Algorithm)
+		elif symbol == pyglet.window.key.M:
+			self.world.searchMode = self.world.searchMode % len(SEARCHES) + 1
+			self.updateSearchDisplay()
+			self.planPath()
+		elif symbol == pyglet.window.key.N:
+			self.world.searchMode = (self.world.searchMode - 2) % len(SEARCHES) + 1
+			self.updateSearchDisplay()
+			self.planPath()
+    
 		# Update the current agent
 		elif symbol == pyglet.window.key.C:
 			self.world.agents[0].targetBox = self.world.agents[3].currentBox
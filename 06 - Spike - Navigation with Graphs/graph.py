@@ -1,3 +1,7 @@
+from array import array
+
+INF = float('inf')
+
 class Edge(object):
     '''A single weighted (has a cost) and directed (has direction) edge. '''
     def __init__(self, from_idx=-1, to_idx=-1, cost=0.0):
@@ -58,6 +62,12 @@ class SparseGraph(object):
         keys.sort() # in-place
         return keys
 
+    def get_neighbour_costs(self, node_idx):
+        ''' Return (to_idx, cost) pairs for each edge leaving the node, sorted
+        by to_idx. This is what the searches iterate over. '''
+        edges = self.edgelist[node_idx]
+        return [(to_idx, edges[to_idx].cost) for to_idx in sorted(edges)]
+
     def add_node(self, node):
         ''' Add new node and assign it the current next_node_idx. '''
         # It is possible to "jump" index values and leave gaps in the sequence.
@@ -125,6 +135,25 @@ class SparseGraph(object):
     def summary(self):
         return 'n:%d e:%d (digraph:%d)' % (self.num_nodes(), self.num_edges(), self.digraph)
 
+    def reverse(self):
+        ''' Return a new graph with the same nodes and every edge flipped
+        (same cost). Used to search backwards from a target. '''
+        g = SparseGraph(self.digraph)
+        g.cost_h = self.cost_h
+        for idx, node in self.nodes.items():
+            g.nodes[idx] = node
+            g.edgelist[idx] = {}
+        g.next_node_idx = self.next_node_idx
+        for from_idx, edges in self.edgelist.items():
+            for to_idx, edge in edges.items():
+                g.edgelist[to_idx][from_idx] = Edge(to_idx, from_idx, edge.cost)
+        return g
+
+    def freeze(self):
+        ''' Return a read-only FrozenGraph (CSR) snapshot of this graph. Later
+        changes to this graph are not seen by the snapshot. '''
+        return FrozenGraph(self)
+
     def get_adj_list_str(self):
         ''' simple method to pretty-format (sorted) edges as an adjacency list '''
         result = []
@@ -150,4 +179,224 @@ class SparseGraph(object):
             from_idx = list[0]
             for to_idx in list[1:]: #skip from index
                 g.add_edge(Edge(from_idx, to_idx))
-        return g
\ No newline at end of file
+        return g
+
+
+class FrozenGraph(object):
+    '''A read-only compressed sparse row (CSR) copy of a SparseGraph.
+    The edges leaving node idx are stored (sorted by to_idx) in the slots
+    offsets[idx] to offsets[idx+1] of the flat targets and costs arrays, so
+    there are no Edge objects and iterating neighbours does not build lists.
+    Node idx values are used directly as row numbers, so gaps in the index
+    sequence just become empty rows. It is for graphs built as a SparseGraph
+    (the box world has its own array-backed LayeredGraph and BoxGrid).
+    '''
+
+    def __init__(self, graph):
+        self.digraph = graph.digraph
+        self.cost_h = graph.cost_h # heuristic cost function reference
+        size = max(graph.nodes) + 1 if graph.nodes else 0
+        self.present = bytearray(size) # 1 if the node idx is in the graph
+        self.offsets = array('l', [0] * (size + 1))
+        self.targets = array('l')
+        self.costs = array('d')
+        for idx in range(size):
+            if idx in graph.nodes:
+                self.present[idx] = 1
+                edges = graph.edgelist[idx]
+                for to_idx in sorted(edges):
+                    self.targets.append(to_idx)
+                    self.costs.append(edges[to_idx].cost)
+            self.offsets[idx + 1] = len(self.targets)
+        # memoryview slices share the array buffers instead of copying them
+        self._targets = memoryview(self.targets)
+        self._costs = memoryview(self.costs)
+
+    def is_empty(self):
+        ''' Return True if graph contains no nodes '''
+        return not any(self.present)
+
+    def is_node(self, idx):
+        ''' Returns True if a node with the given idx is in the graph '''
+        return 0 <= idx < len(self.present) and self.present[idx] == 1
+
+    def _slot(self, from_idx, to_idx):
+        ''' Return the array slot of the edge, or -1 if there is no edge.
+        Rows are sorted so a binary search is enough. '''
+        if not self.is_node(from_idx):
+            return -1
+        lo, hi = self.offsets[from_idx], self.offsets[from_idx + 1]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.targets[mid] < to_idx:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.offsets[from_idx + 1] and self.targets[lo] == to_idx:
+            return lo
+        return -1
+
+    def is_edge(self, from_idx, to_idx):
+        ''' Return True if edge exists '''
+        return self._slot(from_idx, to_idx) >= 0
+
+    def get_edge(self, from_idx, to_idx):
+        ''' Return a (new) Edge that joins the two nodes specified as indexes.
+        Returns None if there is no edge. '''
+        slot = self._slot(from_idx, to_idx)
+        if slot < 0:
+            return None
+        return Edge(from_idx, to_idx, self.costs[slot])
+
+    def get_neighbours(self, node_idx):
+        ''' Return the linked nodes as idx (index) values. This is a view of
+        the targets array, not a copy. '''
+        return self._targets[self.offsets[node_idx]:self.offsets[node_idx + 1]]
+
+    def get_neighbour_costs(self, node_idx):
+        ''' Return (to_idx, cost) pairs for each edge leaving the node, sorted
+        by to_idx. '''
+        start, end = self.offsets[node_idx], self.offsets[node_idx + 1]
+        return zip(self._targets[start:end], self._costs[start:end])
+
+    def num_nodes(self):
+        ''' return the number of nodes '''
+        return sum(self.present)
+
+    def num_edges(self):
+        ''' return the total number of edges in the graph '''
+        return len(self.targets)
+
+    def path_cost(self, path):
+        '''Return the cost of travelling on each node in the path list.'''
+        result = 0
+        for i,j in zip(path[:-1], path[1:]):
+            result += self.costs[self._slot(i, j)]
+        return result
+
+    def reverse(self):
+        ''' Return a new FrozenGraph with every edge flipped (same cost), built
+        straight from the arrays. Used to search backwards from a target. '''
+        size = len(self.present)
+        g = FrozenGraph.__new__(FrozenGraph)
+        g.digraph = self.digraph
+        g.cost_h = self.cost_h
+        g.present = bytearray(self.present)
+        # count the edges into each node to find where its row starts
+        offsets = [0] * (size + 1)
+        for to_idx in self.targets:
+            offsets[to_idx + 1] += 1
+        for idx in range(size):
+            offsets[idx + 1] += offsets[idx]
+        g.offsets = array('l', offsets)
+        g.targets = array('l', [0] * len(self.targets))
+        g.costs = array('d', [0.0] * len(self.costs))
+        # rows are read in from_idx order, so the flipped rows come out sorted
+        fill = offsets[:-1]
+        for from_idx in range(size):
+            for slot in range(self.offsets[from_idx], self.offsets[from_idx + 1]):
+                to_idx = self.targets[slot]
+                g.targets[fill[to_idx]] = from_idx
+                g.costs[fill[to_idx]] = self.costs[slot]
+                fill[to_idx] += 1
+        g._targets = memoryview(g.targets)
+        g._costs = memoryview(g.costs)
+        return g
+
+    def summary(self):
+        return 'n:%d e:%d (digraph:%d, frozen)' % (self.num_nodes(), self.num_edges(), self.digraph)
+
+
+class LayeredGraph(object):
+    '''A graph made of a topology, which many graphs can share, plus a cost
+    layer of its own. The topology is a list of (to_idx, distance) pairs for
+    each node (sorted by to_idx), and the cost layer an array of the cost of
+    leaving each node (inf if it has no edges out). The edge from_idx->to_idx
+    costs costs[from_idx] * distance.
+
+    So graphs of different traversal profiles over the same boxes only
+    differ by one cost array, and re-costing the edges leaving a node is a
+    single write (set_cost). reverse() is a view with every edge flipped that
+    shares both, so it never needs updating. It needs a symmetric topology
+    (j is listed for i, at the same distance, whenever i is listed for j).
+    Node idx values run from 0 to len(costs)-1.
+    '''
+
+    def __init__(self, topology, costs, reverse=False):
+        self.topology = topology # list of [(to_idx, distance)] per node, shared
+        self.costs = costs # array of the cost of leaving each node
+        self.flipped = reverse # True for a reverse() view
+        self.digraph = True
+        self.cost_h = None # heuristic cost function reference
+
+    @property
+    def nodes(self):
+        return range(len(self.costs))
+
+    def is_empty(self):
+        ''' Return True if graph contains no nodes '''
+        return len(self.costs) == 0
+
+    def is_node(self, idx):
+        ''' Returns True if a node with the given idx is in the graph '''
+        return 0 <= idx < len(self.costs)
+
+    def set_cost(self, idx, cost):
+        ''' Change the cost of leaving node idx (inf for no edges out). '''
+        self.costs[idx] = cost
+
+    def get_neighbour_costs(self, node_idx):
+        ''' Return (to_idx, cost) pairs for each edge leaving the node, sorted
+        by to_idx. '''
+        costs = self.costs
+        if self.flipped:
+            return [(from_idx, costs[from_idx] * distance) for from_idx, distance in self.topology[node_idx]
+                    if costs[from_idx] != INF]
+        cost = costs[node_idx]
+        if cost == INF:
+            return []
+        return [(to_idx, cost * distance) for to_idx, distance in self.topology[node_idx]]
+
+    def get_neighbours(self, node_idx):
+        ''' Return a list of the linked nodes as idx (index) values. '''
+        return [to_idx for to_idx, cost in self.get_neighbour_costs(node_idx)]
+
+    def is_edge(self, from_idx, to_idx):
+        ''' Return True if edge exists '''
+        return self.get_edge(from_idx, to_idx) is not None
+
+    def get_edge(self, from_idx, to_idx):
+        ''' Return a (new) Edge that joins the two nodes specified as indexes.
+        Returns None if there is no edge. '''
+        if not (self.is_node(from_idx) and self.is_node(to_idx)):
+            return None
+        for idx, cost in self.get_neighbour_costs(from_idx):
+            if idx == to_idx:
+                return Edge(from_idx, to_idx, cost)
+        return None
+
+    def num_nodes(self):
+        ''' return the number of nodes '''
+        return len(self.costs)
+
+    def num_edges(self):
+        ''' return the total number of edges in the graph '''
+        return sum(len(self.get_neighbour_costs(idx)) for idx in self.nodes)
+
+    def path_cost(self, path):
+        '''Return the cost of travelling on each node in the path list.'''
+        result = 0
+        for i,j in zip(path[:-1], path[1:]):
+            result += self.get_edge(i, j).cost
+        return result
+
+    def reverse(self):
+        ''' Return a view of this graph with every edge flipped (same cost),
+        sharing the topology and cost layer. Used to search backwards from a
+        target. '''
+        g = LayeredGraph(self.topology, self.costs, not self.flipped)
+        g.cost_h = self.cost_h
+        return g
+
+    def summary(self):
+        return 'n:%d e:%d (digraph:%d, layered)' % (self.num_nodes(), self.num_edges(), self.digraph)
@@ -50,7 +50,8 @@ class GameWindow(pyglet.window.Window):
 			'mouse':	pyglet.text.Label('', x=5, y=self.height-20, color=COLOUR_NAMES['BLACK']),
 			'status':	pyglet.text.Label('', x=200, y=self.height-20, color=COLOUR_NAMES['BLACK']),
 			'limit':	pyglet.text.Label('', x=375, y=self.height-20, color=COLOUR_NAMES['BLACK']),
-			'agent':    pyglet.text.Label('', x=500, y=self.height-20, color=COLOUR_NAMES['BLACK'])
+			'agent':    pyglet.text.Label('', x=500, y=self.height-20, color=COLOUR_NAMES['BLACK']),
+			'search':	pyglet.text.Label('', x=5, y=self.height-40, color=COLOUR_NAMES['BLACK'])
 		}
 		# add extra event handlers we need
 		self.add_handlers()
@@ -67,7 +68,7 @@ class GameWindow(pyglet.window.Window):
 			# self.world.resize(cx, cy-25)
 			# reposition the labels.
 			for key, label in list(self.labels.items()):
-				label.y = cy-20
+				label.y = cy-40 if key == 'search' else cy-20
 
 		@self.event
 		def on_mouse_press(x, y, button, modifiers):
@@ -93,6 +94,13 @@ class GameWindow(pyglet.window.Window):
 				from game import game
 				game.input_keyboard(symbol, modifiers)
 
+		@self.event
+		def on_close():
+			# let the game clean up (the window then closes as usual)
+			from game import game
+			if game is not None:
+				game.close()
+
 		@self.event
 		def on_draw():
 			self.clear()
@@ -0,0 +1,200 @@
+from math import hypot
+
+from graph import Edge
+from hpa_star import ClusterAbstraction
+
+INF = float('inf')
+DIAGONAL = 1.4142 # sqrt(1+1), same as the box world diagonal edges
+# (dx, dy, distance) of the moves to the eight boxes around a box, in box
+# idx order (so the neighbours of a box come out sorted)
+MOVES = [(-1, -1, DIAGONAL), (0, -1, 1.0), (1, -1, DIAGONAL), (-1, 0, 1.0),
+	(1, 0, 1.0), (-1, 1, DIAGONAL), (0, 1, 1.0), (1, 1, DIAGONAL)]
+
+class GridTopology(dict):
+	''' The (idx, distance) neighbours of every box of an nx by ny grid, as
+	the topology of a LayeredGraph, sorted by idx. The neighbours of a box
+	are only worked out (and kept) the first time they are asked for, so a
+	new topology costs nothing, however big the grid, and only the boxes a
+	search reaches take up memory. '''
+
+	def __init__(self, nx, ny):
+		dict.__init__(self)
+		self.nx = nx
+		self.ny = ny
+
+	def __missing__(self, idx):
+		nx, ny = self.nx, self.ny
+		if not 0 <= idx < nx * ny:
+			raise KeyError(idx)
+		x, y = idx % nx, idx // nx
+		neighbours = [(idx + dy * nx + dx, distance) for dx, dy, distance in MOVES
+			if 0 <= x + dx < nx and 0 <= y + dy < ny]
+		self[idx] = neighbours
+		return neighbours
+
+class BoxGrid(object):
+	''' Implicit navigation graph for one traversal profile over a box world.
+	There are no Node or Edge objects: the box types are kept as a compact
+	array of tile codes (which can be shared by the grids of every profile),
+	and each grid only has a small table of the cost of each tile code (inf
+	for walls). Neighbours and edge costs are worked out when asked for.
+	Box idx values match the box world: idx = y * nx + x.
+
+	A move goes to one of the (up to) eight boxes around and costs the cost
+	of the box being left times the move distance (1 or 1.4142), the same as
+	the edges of the box world navigation graph. It offers the same methods
+	the searches use on a SparseGraph.
+	'''
+
+	def __init__(self, nx, ny, tiles, table, min_cost=None):
+		self.nx = nx
+		self.ny = ny
+		self.tiles = tiles # bytearray of tile codes, one per box
+		self.table = table # cost of each tile code for this profile
+		if min_cost is None:
+			min_cost = min(table)
+		self.min_cost = min_cost # must be min value for heuristic cost to work
+		self.abstraction = None # HPA* cluster layer, built on first use
+
+	@property
+	def nodes(self):
+		return range(self.nx * self.ny)
+
+	def cost(self, idx):
+		''' Cost of leaving box idx (per move distance), inf for walls. '''
+		return self.table[self.tiles[idx]]
+
+	def set_tile(self, idx, tile):
+		''' Change the tile code of one box. '''
+		self.tiles[idx] = tile
+		self.box_changed(idx)
+
+	def box_changed(self, idx):
+		''' The tile of box idx was changed (maybe through a shared tiles
+		array), so update the cluster layer. '''
+		if self.abstraction is not None:
+			self.abstraction.box_changed(idx)
+
+	def get_abstraction(self):
+		''' Return the HPA* ClusterAbstraction for this grid. '''
+		if self.abstraction is None:
+			self.abstraction = ClusterAbstraction(self)
+		return self.abstraction
+
+	def in_grid(self, x, y):
+		return 0 <= x < self.nx and 0 <= y < self.ny
+
+	def cost_at(self, x, y):
+		''' Cost of leaving box (x, y), inf if it is a wall or off the grid. '''
+		if 0 <= x < self.nx and 0 <= y < self.ny:
+			return self.table[self.tiles[y * self.nx + x]]
+		return INF
+
+	def is_node(self, idx):
+		return 0 <= idx < self.nx * self.ny
+
+	def get_neighbour_costs(self, node_idx):
+		''' Return (to_idx, cost) pairs for each move out of the box, sorted
+		by to_idx. Walls have no moves out. '''
+		cost = self.table[self.tiles[node_idx]]
+		if cost == INF:
+			return []
+		nx = self.nx
+		x, y = node_idx % nx, node_idx // nx
+		result = []
+		for dy in (-1, 0, 1):
+			if 0 <= y + dy < self.ny:
+				for dx in (-1, 0, 1):
+					if (dx or dy) and 0 <= x + dx < nx:
+						result.append((node_idx + dy * nx + dx, cost * DIAGONAL if dx and dy else cost))
+		return result
+
+	def get_neighbours(self, node_idx):
+		''' Return a list of the linked boxes as idx (index) values. '''
+		return [to_idx for to_idx, cost in self.get_neighbour_costs(node_idx)]
+
+	def is_edge(self, from_idx, to_idx):
+		dx = abs(from_idx % self.nx - to_idx % self.nx)
+		dy = abs(from_idx // self.nx - to_idx // self.nx)
+		return (self.is_node(from_idx) and self.is_node(to_idx) and max(dx, dy) == 1
+			and self.cost(from_idx) != INF)
+
+	def get_edge(self, from_idx, to_idx):
+		''' Return a (new) Edge that joins the two boxes, or None. '''
+		if not self.is_edge(from_idx, to_idx):
+			return None
+		return Edge(from_idx, to_idx, self.move_cost(from_idx, to_idx))
+
+	def num_nodes(self):
+		return self.nx * self.ny
+
+	def num_edges(self):
+		return sum(len(self.get_neighbour_costs(idx)) for idx in self.nodes)
+
+	def cost_h(self, idx1, idx2):
+		''' Octile distance between two boxes, assuming the minimal cost so
+		that we don't overestimate the cost. '''
+		dx = abs(idx1 % self.nx - idx2 % self.nx)
+		dy = abs(idx1 // self.nx - idx2 // self.nx)
+		return (max(dx, dy) + (DIAGONAL - 1) * min(dx, dy)) * self.min_cost
+
+	def move_cost(self, from_idx, to_idx):
+		''' Cost of a straight or diagonal run of moves between two boxes, or
+		of any other straight line (see line_of_sight) between them. '''
+		dx = abs(from_idx % self.nx - to_idx % self.nx)
+		dy = abs(from_idx // self.nx - to_idx // self.nx)
+		if dx and dy and dx != dy:
+			return self.cost(from_idx) * hypot(dx, dy)
+		steps = max(dx, dy)
+		return self.cost(from_idx) * steps * (DIAGONAL if dx and dy else 1.0)
+
+	def line_of_sight(self, from_idx, to_idx):
+		''' True if the straight line between the two box centres only
+		crosses boxes of the same cost as box from_idx, so it costs that cost
+		times its length. Box to_idx itself can be of any cost, and the line
+		can pass between two boxes that only touch at a corner, like a
+		diagonal move can. '''
+		cost = self.cost(from_idx)
+		if cost == INF:
+			return False
+		nx = self.nx
+		x, y = from_idx % nx, from_idx // nx
+		x1, y1 = to_idx % nx, to_idx // nx
+		dx, dy = abs(x1 - x), abs(y1 - y)
+		sx, sy = (1 if x1 > x else -1), (1 if y1 > y else -1)
+		ix = iy = 0 # box boundaries crossed so far, along x and y
+		while ix < dx or iy < dy:
+			# cross whichever boundary the line meets first (both at a corner)
+			decision = (1 + 2 * ix) * dy - (1 + 2 * iy) * dx
+			if decision <= 0:
+				x += sx
+				ix += 1
+			if decision >= 0:
+				y += sy
+				iy += 1
+			if (ix < dx or iy < dy) and self.table[self.tiles[y * nx + x]] != cost:
+				return False
+		return True
+
+	def path_cost(self, path):
+		'''Return the cost of travelling on each box in the path list.'''
+		result = 0
+		for i,j in zip(path[:-1], path[1:]):
+			result += self.move_cost(i, j)
+		return result
+
+	def summary(self):
+		return 'grid:%dx%d tiles:%d' % (self.nx, self.ny, len(self.table))
+
+	def snapshot(self):
+		''' Return a read-only copy (immutable tiles, no cluster layer and the
+		plain octile cost_h) that is cheap to send to other processes. '''
+		return BoxGrid(self.nx, self.ny, bytes(self.tiles), tuple(self.table), self.min_cost)
+
+	@classmethod
+	def FromCosts(cls, nx, ny, costs, min_cost=None):
+		''' Build a grid from a list of box costs, one tile code per distinct
+		cost. Handy for tests and generated maps. '''
+		table = sorted(set(costs))
+		codes = dict((cost, code) for code, cost in enumerate(table))
+		return cls(nx, ny, bytearray(codes[cost] for cost in costs), table, min_cost)
@@ -0,0 +1,309 @@
+from searches import Path, SearchAStar, SearchDijkstraTree
+
+INF = float('inf')
+DIAGONAL = 1.4142 # sqrt(1+1), same as the box world diagonal edges
+MARGIN = 1 # clusters around the ones a box by box search may also use
+
+class ClusterView(object):
+	''' The part of a BoxGrid inside one cluster, seen as a graph that the
+	searches can use. With reverse=True every move is flipped (same cost), for
+	searching backwards from a target. '''
+
+	def __init__(self, grid, bounds, reverse=False):
+		self.grid = grid
+		self.x0, self.y0, self.x1, self.y1 = bounds # x1, y1 not included
+		self.reverse = reverse
+		self.cost_h = grid.cost_h
+
+	def get_neighbour_costs(self, idx):
+		grid = self.grid
+		x, y = idx % grid.nx, idx // grid.nx
+		result = []
+		for dy in (-1, 0, 1):
+			for dx in (-1, 0, 1):
+				tx, ty = x + dx, y + dy
+				if (dx or dy) and self.x0 <= tx < self.x1 and self.y0 <= ty < self.y1:
+					# the cost is always that of the box being left
+					cost = grid.cost_at(tx, ty) if self.reverse else grid.cost_at(x, y)
+					if cost != INF:
+						result.append((ty * grid.nx + tx, cost * (DIAGONAL if dx and dy else 1.0)))
+		return result
+
+	def path_cost(self, path):
+		return self.grid.path_cost(path)
+
+
+class AbstractView(object):
+	''' The abstract graph of a ClusterAbstraction plus the extra edges added
+	for one query (from the source and to the target). '''
+
+	def __init__(self, abstraction, extra):
+		self.abstraction = abstraction
+		self.extra = extra # dict of {from_idx: {to_idx: cost}}
+		self.cost_h = abstraction.grid.cost_h
+
+	def _edges(self, idx):
+		edges = dict(self.abstraction.inter.get(idx, {}))
+		cluster = self.abstraction.cluster_of(idx)
+		edges.update(self.abstraction.intra.get(cluster, {}).get(idx, {}))
+		for to_idx, cost in self.extra.get(idx, {}).items():
+			edges[to_idx] = min(cost, edges.get(to_idx, INF))
+		return edges
+
+	def get_neighbour_costs(self, idx):
+		return sorted(self._edges(idx).items())
+
+	def path_cost(self, path):
+		result = 0
+		for i,j in zip(path[:-1], path[1:]):
+			result += self._edges(i)[j]
+		return result
+
+
+class ClusterAbstraction(object):
+	''' Hierarchical path-finding (HPA*) layer over a BoxGrid.
+
+	The grid is cut into square clusters. Where two side by side clusters
+	share a run of open boxes along their border, one or two "transition"
+	box pairs are picked (an entrance). The abstract graph has the transition
+	boxes as nodes, with inter edges across each entrance and intra edges
+	between the transitions of the same cluster, costed with a search that
+	stays inside the cluster.
+
+	A long route is then planned on the small abstract graph, and only the
+	intra edges it uses are turned back into boxes. Having to go through the
+	picked transitions can make that route much dearer than the cheapest, so
+	it is then smoothed: searched again, two clusters (and the clusters
+	around them) at a time. Short routes, to the same or a next cluster, are
+	searched box by box like that instead. Paths are usually close to the
+	cheapest, but that is not promised.
+	'''
+
+	def __init__(self, grid, cluster_size=10):
+		self.grid = grid
+		self.size = cluster_size
+		self.cx = (grid.nx + cluster_size - 1) // cluster_size # clusters across
+		self.cy = (grid.ny + cluster_size - 1) // cluster_size # clusters up
+		self.entrances = {} # dict of {(cluster, cluster): [(idx, idx) pairs]}
+		self.transitions = {} # dict of {cluster: set of transition idx}
+		self.inter = {} # dict of {from_idx: {to_idx: cost}} across borders
+		self.intra = {} # dict of {cluster: {from_idx: {to_idx: cost}}}
+		self.build()
+
+	def cluster_of(self, idx):
+		return (idx % self.grid.nx // self.size, idx // self.grid.nx // self.size)
+
+	def bounds(self, cluster, other=None, margin=0):
+		''' The (x0, y0, x1, y1) box bounds of a cluster, or of the smallest
+		block of clusters that holds both cluster and other, grown by margin
+		clusters on every side. '''
+		if other is None:
+			other = cluster
+		cx0, cx1 = max(min(cluster[0], other[0]) - margin, 0), max(cluster[0], other[0]) + 1 + margin
+		cy0, cy1 = max(min(cluster[1], other[1]) - margin, 0), max(cluster[1], other[1]) + 1 + margin
+		return (cx0 * self.size, cy0 * self.size,
+			min(cx1 * self.size, self.grid.nx), min(cy1 * self.size, self.grid.ny))
+
+	def is_near(self, cluster, other):
+		''' True if the clusters are the same or touch (at a side or corner). '''
+		return abs(cluster[0] - other[0]) <= 1 and abs(cluster[1] - other[1]) <= 1
+
+	def build(self):
+		''' Find every entrance, then cost the intra edges of every cluster. '''
+		clusters = [(x, y) for y in range(self.cy) for x in range(self.cx)]
+		for cluster in clusters:
+			self.transitions[cluster] = set()
+		for cluster in clusters:
+			for border in self._borders(cluster):
+				if border[0] == cluster:
+					self._find_entrances(border)
+		for cluster in clusters:
+			self._build_intra(cluster)
+
+	def _borders(self, cluster):
+		''' The (lower, upper) cluster pairs on each side of a cluster. '''
+		x, y = cluster
+		borders = []
+		if x > 0:
+			borders.append(((x - 1, y), cluster))
+		if x + 1 < self.cx:
+			borders.append((cluster, (x + 1, y)))
+		if y > 0:
+			borders.append(((x, y - 1), cluster))
+		if y + 1 < self.cy:
+			borders.append((cluster, (x, y + 1)))
+		return borders
+
+	def _find_entrances(self, border):
+		''' (Re)place the transitions along one border. Each run of box pairs
+		that are open on both sides gets a transition in the middle, or one at
+		each end if the run is long. '''
+		grid = self.grid
+		for a, b in self.entrances.get(border, []):
+			for from_idx, to_idx in ((a, b), (b, a)):
+				del self.inter[from_idx][to_idx]
+				if not self.inter[from_idx]:
+					del self.inter[from_idx]
+		(ax, ay), (bx, by) = border
+		x0, y0, x1, y1 = self.bounds(border[0])
+		if bx > ax: # vertical border line, pairs side by side
+			cells = [((x1 - 1, y), (x1, y)) for y in range(y0, y1)]
+		else: # horizontal border line, pairs one above the other
+			cells = [((x, y1 - 1), (x, y1)) for x in range(x0, x1)]
+		is_open = [grid.cost_at(*a) != INF and grid.cost_at(*b) != INF for a, b in cells]
+		pairs = []
+		run = []
+		for k, (a, b) in enumerate(cells + [(None, None)]):
+			if a is not None and is_open[k]:
+				run.append((a[1] * grid.nx + a[0], b[1] * grid.nx + b[0]))
+				continue
+			if len(run) >= 6:
+				pairs.extend([run[0], run[-1]])
+			elif run:
+				pairs.append(run[len(run) // 2])
+			run = []
+		# a diagonal move is the only way across where two blocked pairs meet
+		for k in range(len(cells) - 1):
+			if is_open[k] or is_open[k + 1]:
+				continue
+			for a, b in ((cells[k][0], cells[k + 1][1]), (cells[k + 1][0], cells[k][1])):
+				if grid.cost_at(*a) != INF and grid.cost_at(*b) != INF:
+					pairs.append((a[1] * grid.nx + a[0], b[1] * grid.nx + b[0]))
+		self.entrances[border] = pairs
+		for a, b in pairs:
+			self.inter.setdefault(a, {})[b] = grid.move_cost(a, b)
+			self.inter.setdefault(b, {})[a] = grid.move_cost(b, a)
+		self._update_transitions(border[0])
+		self._update_transitions(border[1])
+
+	def _update_transitions(self, cluster):
+		transitions = set()
+		for border in self._borders(cluster):
+			for a, b in self.entrances.get(border, []):
+				transitions.add(a if border[0] == cluster else b)
+		self.transitions[cluster] = transitions
+
+	def _build_intra(self, cluster):
+		''' Cost the best path, inside the cluster, between each pair of its
+		transitions, with one Dijkstra search per transition. '''
+		view = ClusterView(self.grid, self.bounds(cluster))
+		transitions = self.transitions[cluster]
+		self.intra[cluster] = {}
+		for a in transitions:
+			tree = SearchDijkstraTree(view, a, targets=transitions - {a})
+			self.intra[cluster][a] = dict((b, tree.cost(b)) for b in transitions if b != a and b in tree)
+
+	def box_changed(self, idx):
+		''' The cost of box idx changed. Re-place the entrances on the borders
+		of its cluster and re-cost the intra edges of the clusters affected. '''
+		cluster = self.cluster_of(idx)
+		rebuild = {cluster}
+		for border in self._borders(cluster):
+			before = {border[0]: set(self.transitions[border[0]]), border[1]: set(self.transitions[border[1]])}
+			self._find_entrances(border)
+			for other in border:
+				if self.transitions[other] != before[other]:
+					rebuild.add(other)
+		for other in rebuild:
+			self._build_intra(other)
+
+	def get_path(self, source_idx, target_idx, limit=0):
+		''' Return the Path from source_idx to target_idx. If both are in the
+		same or touching clusters, it is an A* search over just those and the
+		clusters around them. If not: link both ends to the transitions of
+		their clusters, search the abstract graph, refine each abstract edge
+		into boxes and smooth the result. '''
+		grid = self.grid
+		if source_idx == target_idx:
+			return Path(grid, {source_idx: source_idx}, target_idx, [], set(), 0)
+		source_cluster, target_cluster = self.cluster_of(source_idx), self.cluster_of(target_idx)
+		if self.is_near(source_cluster, target_cluster):
+			view = ClusterView(grid, self.bounds(source_cluster, target_cluster, MARGIN))
+			local = SearchAStar(view, source_idx, target_idx, limit)
+			if limit > 0 and local.steps >= limit and local.result != 'Success! Done!':
+				return Path(grid, {}, target_idx, [], set(), local.steps)
+			if local.path:
+				return Path(grid, local.route, target_idx, [], set(), local.steps)
+			# no way there without leaving the clusters, so go the long way
+
+		extra = {source_idx: {}}
+		# from the source to the transitions of its cluster (and the target,
+		# if that is in the same cluster)
+		targets = set(self.transitions[source_cluster])
+		if source_cluster == target_cluster:
+			targets.add(target_idx)
+		tree = SearchDijkstraTree(ClusterView(grid, self.bounds(source_cluster)), source_idx, targets=targets)
+		for b in targets:
+			if b in tree:
+				extra[source_idx][b] = tree.cost(b)
+		# from the transitions of the target cluster to the target
+		rtree = SearchDijkstraTree(ClusterView(grid, self.bounds(target_cluster), reverse=True), target_idx,
+			targets=self.transitions[target_cluster], reverse=True)
+		for a in self.transitions[target_cluster]:
+			if a in rtree:
+				extra.setdefault(a, {})[target_idx] = rtree.cost(a)
+
+		abstract = SearchAStar(AbstractView(self, extra), source_idx, target_idx, limit)
+		if not abstract.path or abstract.result.endswith('Still going...'):
+			return Path(grid, {}, target_idx, [], set(), abstract.steps)
+
+		# refine: the inter edges are single moves, the rest are searched
+		# again inside their cluster
+		path = [source_idx]
+		for a, b in zip(abstract.path[:-1], abstract.path[1:]):
+			if self.cluster_of(a) != self.cluster_of(b):
+				path.append(b)
+				continue
+			view = ClusterView(grid, self.bounds(self.cluster_of(a)))
+			path.extend(SearchAStar(view, a, b).path[1:])
+		path = self.smooth(path)
+		# a route dict can't hold a box twice (Path would walk it forever)
+		assert len(set(path)) == len(path), 'HPA* path visits a box twice'
+		route = {path[0]: path[0]} # to:from
+		for from_idx, to_idx in zip(path[:-1], path[1:]):
+			route[to_idx] = from_idx
+		return Path(grid, route, target_idx, [], set(), abstract.steps)
+
+	def smooth(self, path):
+		''' Search a box path again in parts, so it no longer has to cross
+		the cluster borders at the transitions. Each part runs from a box in
+		one cluster to the middle of the path's stay in the next cluster it
+		goes to, and is an A* search over just those two clusters and the
+		ones around them. The old part is inside them too, so a part never
+		gets dearer. Parts are searched on their own, so one can cross an
+		earlier one: the loop that makes is cut out (which is never dearer
+		either), so no box is visited twice. '''
+		grid = self.grid
+		result = [path[0]]
+		positions = {path[0]: 0} # dict of {box idx: its position in result}
+		i = 0
+		while i < len(path) - 1:
+			first = self.cluster_of(path[i])
+			# find the run of boxes in the next cluster the path goes to
+			j = i + 1
+			while j < len(path) and self.cluster_of(path[j]) == first:
+				j += 1
+			if j == len(path): # the rest is in this cluster
+				end = len(path) - 1
+				second = first
+			else:
+				second = self.cluster_of(path[j])
+				k = j
+				while k < len(path) and self.cluster_of(path[k]) == second:
+					k += 1
+				end = len(path) - 1 if k == len(path) else (j + k - 1) // 2
+			view = ClusterView(grid, self.bounds(first, second, MARGIN))
+			part = SearchAStar(view, path[i], path[end]).path
+			if not part: # can't happen, but keep the old part if it does
+				part = path[i:end + 1]
+			for idx in part[1:]:
+				if idx in positions:
+					# back at a box already on the path, drop the loop
+					for dropped in result[positions[idx] + 1:]:
+						del positions[dropped]
+					del result[positions[idx] + 1:]
+				else:
+					positions[idx] = len(result)
+					result.append(idx)
+			i = end
+		return result
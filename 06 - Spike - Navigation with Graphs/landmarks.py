@@ -0,0 +1,87 @@
+from array import array
+
+from searches import SearchDijkstraTree
+
+INF = float('inf')
+
+class Landmarks(object):
+	''' ALT (A*, Landmarks, Triangle inequality) heuristic for a graph.
+	A few landmark nodes are picked, and the exact cost from each landmark to
+	every node (and from every node back to it) is stored. For any landmark L
+	the triangle inequality gives two lower bounds on the cost from a to b:
+		cost(L, b) - cost(L, a)  and  cost(a, L) - cost(b, L)
+	cost_h returns the best of these (and of the base heuristic), so it never
+	overestimates but is much tighter than a distance times the minimum cost
+	when the costs range widely.
+
+	Plug it in with graph.cost_h = landmarks.cost_h. The distances are only
+	right for the costs they were built from, so call box_changed after every
+	edit: they are then rebuilt on the next use.
+	'''
+
+	def __init__(self, graph, reverse, size, count=4, base=None):
+		self.graph = graph
+		self.reverse = reverse # graph with all edges flipped
+		self.size = size # number of nodes (idx values 0 .. size-1)
+		self.count = count # number of landmarks to pick
+		self.base = base # other admissible heuristic to combine, or None
+		self.landmarks = []
+		self.dist_from = [] # per landmark, array of cost from it to each node
+		self.dist_to = [] # per landmark, array of cost from each node to it
+		self.stale = True
+
+	def _distances(self, graph, root_idx, reverse=False):
+		tree = SearchDijkstraTree(graph, root_idx, reverse=reverse)
+		dist = array('d', [INF] * self.size)
+		for idx, cost in tree.dist.items():
+			dist[idx] = cost
+		return dist
+
+	def build(self):
+		''' Pick the landmarks, each one the node furthest from the ones picked
+		so far (starting from the node furthest from node 0), and work out
+		their distances. Nodes with no edges out (walls) are never picked. '''
+		self.landmarks, self.dist_from, self.dist_to = [], [], []
+		candidates = [idx for idx in range(self.size) if self.graph.get_neighbour_costs(idx)]
+		if candidates:
+			nearest = self._distances(self.graph, candidates[0])
+			for k in range(self.count):
+				# furthest reachable node from all landmarks so far
+				best, best_idx = -1.0, None
+				for idx in candidates:
+					if best < nearest[idx] < INF and idx not in self.landmarks:
+						best, best_idx = nearest[idx], idx
+				if best_idx is None:
+					break
+				self.landmarks.append(best_idx)
+				self.dist_from.append(self._distances(self.graph, best_idx))
+				self.dist_to.append(self._distances(self.reverse, best_idx, reverse=True))
+				if k == 0:
+					nearest = array('d', self.dist_from[0])
+				else:
+					nearest = array('d', map(min, nearest, self.dist_from[-1]))
+		self.stale = False
+
+	def box_changed(self, idx=None):
+		''' Edge costs changed, so rebuild the distances before the next use. '''
+		self.stale = True
+
+	def cost_h(self, idx1, idx2):
+		''' Lower bound on the cost from idx1 to idx2. '''
+		if self.stale:
+			self.build()
+		best = self.base(idx1, idx2) if self.base is not None else 0.0
+		for dist_from, dist_to in zip(self.dist_from, self.dist_to):
+			# from the landmark: L->idx1->idx2 is at least L->idx2
+			from1, from2 = dist_from[idx1], dist_from[idx2]
+			if from1 < INF:
+				if from2 == INF:
+					return INF # idx2 can't be reached from idx1
+				best = max(best, from2 - from1)
+			# to the landmark: idx1->idx2->L is at least idx1->L
+			to1, to2 = dist_to[idx1], dist_to[idx2]
+			if to2 < INF:
+				if to1 == INF:
+					return INF
+				best = max(best, to1 - to2)
+		return best
@@ -0,0 +1,126 @@
+from graph import Edge, SparseGraph
+from searches import PriorityQueue, Path, SearchTask
+
+INF = float('inf')
+
+class LPAStar(object):
+	''' Lifelong Planning A* (LPA*) between a fixed source and target.
+	The search state (g and rhs costs and the open queue) is kept between
+	calls to compute(), so after some edge costs change only the nodes whose
+	cost-so-far is affected are expanded again, instead of searching from
+	scratch.
+
+	g is the cost-so-far found by the last expansion of a node, rhs is the
+	best cost-so-far offered by its predecessors. A node is "consistent" when
+	the two match; only inconsistent nodes are queued.
+
+	Predecessors are read from a reverse of the graph (graph.reverse() if
+	none is given), so nothing is copied: set up only costs the search state
+	of the nodes it touches.
+	'''
+
+	def __init__(self, graph, source_idx, target_idx, reverse=None):
+		self.source_idx = source_idx
+		self.target_idx = target_idx
+		self.graph = graph
+		self.reverse = reverse if reverse is not None else graph.reverse()
+		self.g = {} # dict of {idx: cost-so-far}, missing means inf
+		self.rhs = {source_idx: 0.0}
+		self.open = PriorityQueue() # inconsistent nodes, by key
+		self.open.push(source_idx, self._key(source_idx))
+
+	def _key(self, idx):
+		best = min(self.g.get(idx, INF), self.rhs.get(idx, INF))
+		# rounded, so that float error can't break ties with the target key
+		# (tight heuristics such as landmarks make exact ties common)
+		return (round(best + self.graph.cost_h(idx, self.target_idx), 9), round(best, 9))
+
+	def _update_node(self, idx):
+		''' Recalculate rhs from the predecessors and (re)queue if needed. '''
+		if idx != self.source_idx:
+			best = INF
+			for from_idx, cost in self.reverse.get_neighbour_costs(idx):
+				best = min(best, self.g.get(from_idx, INF) + cost)
+			self.rhs[idx] = best
+		if idx in self.open:
+			self.open.remove(idx)
+		if self.g.get(idx, INF) != self.rhs.get(idx, INF):
+			self.open.push(idx, self._key(idx))
+
+	def update_graph(self, graph, changed, reverse=None):
+		''' Use a new (or edited) graph in which only the edges leaving some
+		nodes are different. changed is a dict of {idx: the nodes it had
+		edges to before}. Only the successors of those nodes (old or new)
+		need their rhs recalculated. The heuristic may have changed too
+		(landmarks are rebuilt after edits), so the open queue is re-keyed. '''
+		self.graph = graph
+		if reverse is not None:
+			self.reverse = reverse
+		elif isinstance(self.reverse, SparseGraph):
+			# a SparseGraph reverse is a copy (other graphs give views that
+			# are always up to date)
+			for from_idx, old_dests in changed.items():
+				for to_idx in old_dests:
+					self.reverse.remove_edge(to_idx, from_idx)
+				for to_idx, cost in graph.get_neighbour_costs(from_idx):
+					self.reverse.add_edge(Edge(to_idx, from_idx, cost))
+		for from_idx, old_dests in changed.items():
+			dests = set(old_dests)
+			dests.update(graph.get_neighbours(from_idx))
+			for to_idx in dests:
+				self._update_node(to_idx)
+		for idx in list(self.open.pos):
+			self.open.remove(idx)
+			self.open.push(idx, self._key(idx))
+
+	def compute(self, limit=0):
+		''' Expand inconsistent nodes until the target cost is known (or the
+		limit of expansions is reached) and return the current Path. '''
+		return SearchTask(self.iter_compute()).run(steps=limit)
+
+	def iter_compute(self):
+		''' compute() as a generator for SearchTask, yielding after each
+		expansion. '''
+		closed = set() # nodes expanded by this call
+		steps = 0
+		def result():
+			return Path(self.graph, self.route(), self.target_idx, self.open, closed, steps)
+		while len(self.open):
+			top_idx, top_key = self.open.top()
+			target_consistent = self.g.get(self.target_idx, INF) == self.rhs.get(self.target_idx, INF)
+			if top_key >= self._key(self.target_idx) and target_consistent:
+				break
+			steps += 1
+			leaf, key = self.open.pop()
+			closed.add(leaf)
+			if self.g.get(leaf, INF) > self.rhs.get(leaf, INF):
+				self.g[leaf] = self.rhs[leaf] # now consistent
+			else:
+				self.g[leaf] = INF # under-consistent, so redo it and its children
+				self._update_node(leaf)
+			for dest in self.graph.get_neighbours(leaf):
+				self._update_node(dest)
+			# pause here, the caller decides when to go on
+			yield result
+		if not steps:
+			yield result # nothing to do, but there is still a Path
+
+	def route(self):
+		''' Return a {to:from} route dict for the best path found, walking back
+		from the target through the cheapest predecessors. Empty if there is no
+		path (yet). '''
+		if self.g.get(self.target_idx, INF) == INF:
+			return {}
+		route = {}
+		curr_idx = self.target_idx
+		while curr_idx != self.source_idx:
+			best, best_idx = INF, None
+			for from_idx, cost in self.reverse.get_neighbour_costs(curr_idx):
+				if self.g.get(from_idx, INF) + cost < best and from_idx not in route: # no loops
+					best, best_idx = self.g.get(from_idx, INF) + cost, from_idx
+			if best_idx is None:
+				return {}
+			route[curr_idx] = best_idx
+			curr_idx = best_idx
+		route[self.source_idx] = self.source_idx
+		return route
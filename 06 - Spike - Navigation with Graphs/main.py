@@ -20,10 +20,18 @@ import graphics
 import game
 
 if __name__ == '__main__':
-	if len(sys.argv) > 1:
-		filename = sys.argv[1]
+	# optional "--tables" flag precomputes (and saves) all-pairs path tables
+	# optional "--landmarks" flag uses ALT landmark heuristics
+	# optional "--workers" flag plans paths on worker processes
+	# optional "--flow" flag moves the prey with flow fields
+	args = [arg for arg in sys.argv[1:] if arg not in ("--tables", "--landmarks", "--workers", "--flow")]
+	if len(args) > 0:
+		filename = args[0]
 	else:
 		filename = "map3.txt"
 
-	game.game = game.Game(filename)
+	game.game = game.Game(filename, usePathTables="--tables" in sys.argv, useLandmarks="--landmarks" in sys.argv,
+		workers=-1 if "--workers" in sys.argv else 0, useFlowFields="--flow" in sys.argv)
+	# queued path planning is done a slice at a time, every frame
+	pyglet.clock.schedule_interval(game.game.update, 1/60.0)
 	pyglet.app.run()
\ No newline at end of file
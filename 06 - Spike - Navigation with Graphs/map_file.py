@@ -0,0 +1,54 @@
+import mmap
+import struct
+
+# Binary maps (.bxw) hold, in order (all little endian):
+#	header: magic b'BXW2', nx, ny (uint32)
+#	tiles: nx*ny tile codes, one byte each, in box idx order (bottom row first)
+# The nav graphs are not stored: a profile's cost layer is one NumPy lookup
+# of the tiles and the grid topology is worked out as searches reach it, so
+# both are quicker to make than to read back.
+MAGIC = b'BXW2'
+HEADER = struct.Struct('<4sII')
+
+def read_text_map(filename, codes):
+	''' Read a text map (see box_world) a line at a time, straight into a
+	bytearray of tile codes. codes is a dict of {tile: tile code}. Returns
+	nx, ny and the tile codes, in box idx order (the last line is row 0). '''
+	with open(filename) as f:
+		lines = (line.strip() for line in f)
+		lines = (line for line in lines if line and not line.startswith('#'))
+		# first line is the number of boxes width, height
+		nx, ny = [int(bit) for bit in next(lines).split()]
+		tiles = bytearray(nx * ny)
+		row = ny
+		for line in lines:
+			row -= 1
+			assert row >= 0, "Number of rows doesn't match data."
+			bits = line.split()
+			assert len(bits) == nx, "Number of columns doesn't match data."
+			for bit in bits:
+				if bit not in codes:
+					raise ValueError('Not a known tile type "%s"' % bit)
+			tiles[row * nx:(row + 1) * nx] = bytes(codes[bit] for bit in bits)
+		assert row == 0, "Number of rows doesn't match data."
+	return nx, ny, tiles
+
+def write_binary_map(filename, nx, ny, tiles):
+	''' Write a binary map of the given tile codes. '''
+	with open(filename, 'wb') as f:
+		f.write(HEADER.pack(MAGIC, nx, ny))
+		f.write(tiles)
+
+def read_binary_map(filename):
+	''' Read a binary map (memory mapped, so the tiles are copied out in one
+	go). Returns nx, ny and the tile codes. '''
+	with open(filename, 'rb') as f:
+		with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+			magic, nx, ny = HEADER.unpack_from(data, 0)
+			if magic != MAGIC:
+				raise ValueError('Not a binary map file "%s"' % filename)
+			pos = HEADER.size
+			if len(data) < pos + nx * ny:
+				raise ValueError('Binary map file "%s" is too short' % filename)
+			tiles = bytearray(data[pos:pos + nx * ny])
+	return nx, ny, tiles
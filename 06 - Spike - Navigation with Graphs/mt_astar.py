@@ -0,0 +1,110 @@
+from searches import PriorityQueue, Path
+
+INF = float('inf')
+
+class MTAdaptiveAStar(object):
+	''' Moving Target Adaptive A* (MT-Adaptive A*) for an agent chasing a
+	target that moves, e.g. a hunter after its prey, replanning every tick.
+
+	Each search is an A* search from wherever the agent now is, but it
+	learns from the last ones: the heuristic of every node it expands is
+	raised to the cost of the best path found less the node cost-so-far (with
+	a step limit, the lowest f on the open queue less the cost-so-far), which
+	still never overestimates. The next search is then much better informed
+	and expands far fewer nodes.
+
+	When the target moves, the learned values are for the old target. As
+	they are consistent, lowering them all by the learned heuristic of the new
+	target (from the old one) keeps them admissible. That is done lazily: each
+	move adds one shift, applied when a value is read. Box edits can lower
+	costs, so update_graph drops everything learned.
+	'''
+
+	def __init__(self, graph):
+		self.graph = graph
+		self.target_idx = None
+		self.learned = {} # dict of {idx: (learned h, epoch it was learned in)}
+		self.shifts = [0.0] # total shift of the learned values, per epoch (target move)
+		self.steps = 0 # expansions of all searches so far
+
+	def cost_h(self, idx):
+		''' Heuristic cost from idx to the current target. '''
+		base = self.graph.cost_h(idx, self.target_idx)
+		if idx in self.learned:
+			h, epoch = self.learned[idx]
+			h -= self.shifts[-1] - self.shifts[epoch]
+			if h > base:
+				return h
+		return base
+
+	def set_target(self, target_idx):
+		''' Move the target, shifting the learned values to match. '''
+		if target_idx == self.target_idx:
+			return
+		if self.learned:
+			shift = self.cost_h(target_idx) # still for the old target
+			if shift == INF:
+				self.forget() # the new target can't reach the old one
+			else:
+				self.shifts.append(self.shifts[-1] + shift)
+		self.target_idx = target_idx
+
+	def forget(self):
+		self.learned = {}
+		self.shifts = [0.0]
+
+	def update_graph(self, graph):
+		''' Use a new (or edited) graph. Costs may have gone down, so the
+		learned values may now overestimate, and are dropped. '''
+		self.graph = graph
+		self.forget()
+
+	def search(self, source_idx, target_idx, limit=0):
+		''' A* search from source_idx to target_idx, expanding at most limit
+		nodes (0 means no limit). Returns the Path to the target, or, if the
+		limit was reached first, the Path to the most promising open node (its
+		result is then "Still going..."). '''
+		self.set_target(target_idx)
+		graph = self.graph
+		closed = set() # set - of visited nodes
+		route = {source_idx: source_idx} # dict of {to:from} items to find our way home
+		cost_g = {source_idx: 0.0} # dict of {idx: cost-so-far}
+		open = PriorityQueue() # priority queue of the current leaf edges
+		open.push(source_idx, self.cost_h(source_idx))
+		steps = 0
+		found = False
+		while len(open) and not (limit > 0 and steps >= limit):
+			steps += 1
+			leaf, cost_f = open.pop()
+			if leaf == target_idx:
+				found = True
+				break
+			closed.add(leaf) # set 'visited'
+			for dest, edge_cost in graph.get_neighbour_costs(leaf):
+				if dest in closed:
+					continue
+				g = cost_g[leaf] + edge_cost
+				if dest in open:
+					if g >= cost_g[dest]:
+						continue
+					open.decrease_key(dest, g + self.cost_h(dest))
+				else:
+					open.push(dest, g + self.cost_h(dest))
+				cost_g[dest] = g
+				route[dest] = leaf
+		self.steps += steps
+
+		# what this search has learned, as a bound on the cost to the target
+		goal_idx = target_idx
+		if found:
+			bound = cost_g[target_idx]
+		elif len(open):
+			goal_idx, bound = open.top()
+		else:
+			bound = INF # the target can't be reached from any of them
+		epoch = len(self.shifts) - 1
+		for idx in closed:
+			h = bound - cost_g[idx]
+			if h > self.cost_h(idx):
+				self.learned[idx] = (h, epoch)
+		return Path(graph, route, goal_idx, open, closed, steps)
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+
+from searches import Path
+
+class PathCache(object):
+	''' Least recently used (LRU) cache of planned paths, keyed by (profile,
+	source_idx, target_idx, map version). A new map version makes every older
+	entry useless, so they are all dropped at once.
+
+	Any part of a best path that ends at the target is itself a best path, so
+	a query that starts somewhere along a cached path to the same target gets
+	the rest (suffix) of that path, without searching.
+	'''
+
+	def __init__(self, size=256):
+		self.size = size # max number of cached paths
+		self.version = None # map version of the cached paths
+		self.paths = OrderedDict() # dict of {(profile, source, target): Path}, oldest first
+		self.positions = {} # dict of {key: {idx: position in the path}}
+		self.by_target = {} # dict of {(profile, target): set of keys}
+		self.hits = 0
+		self.suffix_hits = 0
+		self.misses = 0
+
+	def _check_version(self, version):
+		if version != self.version:
+			self.clear()
+			self.version = version
+
+	def get(self, profile, source_idx, target_idx, version):
+		''' Return a cached (or suffix) Path, or None. '''
+		self._check_version(version)
+		key = (profile, source_idx, target_idx)
+		if key in self.paths:
+			self.paths.move_to_end(key)
+			self.hits += 1
+			return self.paths[key]
+		for other in self.by_target.get((profile, target_idx), ()):
+			positions = self.positions[other]
+			if source_idx in positions:
+				self.paths.move_to_end(other)
+				self.suffix_hits += 1
+				nodes = self.paths[other].path[positions[source_idx]:]
+				route = {nodes[0]: nodes[0]} # to:from
+				for from_idx, to_idx in zip(nodes[:-1], nodes[1:]):
+					route[to_idx] = from_idx
+				return Path(self.paths[other].graph, route, target_idx, [], set(), 0)
+		self.misses += 1
+		return None
+
+	def put(self, profile, source_idx, target_idx, version, path):
+		''' Cache a finished path (failed or unfinished paths are not kept). '''
+		self._check_version(version)
+		if not path.path or path.result != 'Success! Done!':
+			return
+		key = (profile, source_idx, target_idx)
+		if key in self.paths:
+			self._remove(key)
+		self.paths[key] = path
+		self.positions[key] = dict((idx, i) for i, idx in enumerate(path.path))
+		self.by_target.setdefault((profile, target_idx), set()).add(key)
+		while len(self.paths) > self.size:
+			self._remove(next(iter(self.paths)))
+
+	def _remove(self, key):
+		del self.paths[key]
+		del self.positions[key]
+		self.by_target[(key[0], key[2])].discard(key)
+		if not self.by_target[(key[0], key[2])]:
+			del self.by_target[(key[0], key[2])]
+
+	def clear(self):
+		self.paths = OrderedDict()
+		self.positions = {}
+		self.by_target = {}
+
+	def summary(self):
+		return 'paths:%d hits:%d suffix:%d misses:%d' % (len(self.paths), self.hits, self.suffix_hits, self.misses)
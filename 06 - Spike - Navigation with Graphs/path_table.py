@@ -0,0 +1,125 @@
+import pickle
+from array import array
+
+from graph import Edge, SparseGraph
+from searches import Path, SearchDijkstraTree
+
+INF = float('inf')
+
+class NextHopTable(object):
+	''' All-pairs next-hop table for one navigation graph. For every target
+	there is a row holding, for each node, the next node to step to on a
+	shortest path towards that target (hops) and the cost to get there (dist).
+	A path query is then just a walk along the row, no search needed.
+
+	Rows are made with one reverse Dijkstra search each, either all at once
+	with build() or on first use. Edits only drop the rows they can change.
+	'''
+
+	def __init__(self, graph, size, signature=''):
+		self.size = size # number of nodes (idx values 0 .. size-1)
+		self.signature = signature # what the rows were built from
+		self.rows = {} # dict of {target_idx: (hops array, dist array)}
+		self.set_graph(graph)
+
+	def set_graph(self, graph):
+		''' Use a (re)built navigation graph. Existing rows are kept, so call
+		box_changed for each edited node to drop the rows that are now wrong. '''
+		self.graph = graph
+		self.reverse = graph.reverse()
+
+	def build(self):
+		''' Build the row for every target. '''
+		for target_idx in range(self.size):
+			self.row(target_idx)
+
+	def row(self, target_idx):
+		''' Return the (hops, dist) arrays for target_idx, building if needed. '''
+		if target_idx not in self.rows:
+			tree = SearchDijkstraTree(self.reverse, target_idx, reverse=True)
+			hops = array('l', [-1] * self.size)
+			dist = array('d', [INF] * self.size)
+			for idx in tree.closed:
+				hops[idx] = tree.route[idx]
+				dist[idx] = tree.dist[idx]
+			self.rows[target_idx] = (hops, dist)
+		return self.rows[target_idx]
+
+	def get_path(self, source_idx, target_idx):
+		''' Return the Path from source_idx to target_idx by walking the row. '''
+		hops, dist = self.row(target_idx)
+		if hops[source_idx] < 0:
+			return Path(self.graph, {}, target_idx, [], set(), 0)
+		route = {source_idx: source_idx} # to:from
+		curr_idx = source_idx
+		while curr_idx != target_idx:
+			route[hops[curr_idx]] = curr_idx
+			curr_idx = hops[curr_idx]
+		return Path(self.graph, route, target_idx, [], set(), len(route))
+
+	def box_changed(self, idx, old_dests):
+		''' The edges leaving node idx have new costs, either edited in place
+		or in a new graph given to set_graph. old_dests are the nodes idx had
+		edges to before. Patch or drop each row that this can change:
+		- if idx is now closer to the target, paths from anywhere may now go
+		  through it, so the row is dropped.
+		- if idx is now further away and other nodes route through it, their
+		  costs change too, so the row is dropped.
+		- otherwise only the entry of idx itself changes, so it is patched.
+		'''
+		# a SparseGraph reverse is a copy (other graphs give views that are
+		# always up to date)
+		if isinstance(self.reverse, SparseGraph):
+			for to_idx in old_dests:
+				self.reverse.remove_edge(to_idx, idx)
+			for to_idx, cost in self.graph.get_neighbour_costs(idx):
+				self.reverse.add_edge(Edge(to_idx, idx, cost))
+
+		for target_idx in list(self.rows.keys()):
+			if target_idx == idx:
+				continue # leaving the target never matters
+			hops, dist = self.rows[target_idx]
+			best_cost, best_idx = INF, -1
+			for to_idx, cost in self.graph.get_neighbour_costs(idx):
+				if cost + dist[to_idx] < best_cost:
+					best_cost, best_idx = cost + dist[to_idx], to_idx
+			if best_cost < dist[idx]:
+				del self.rows[target_idx]
+			elif best_cost > dist[idx] and self._has_children(hops, idx):
+				del self.rows[target_idx]
+			else:
+				hops[idx] = best_idx
+				dist[idx] = best_cost
+
+	def _has_children(self, hops, idx):
+		''' True if some other node steps to idx on its way to the target. '''
+		for from_idx in self.reverse.get_neighbours(idx):
+			if hops[from_idx] == idx:
+				return True
+		return False
+
+	def save(self, filename):
+		''' Write the rows built so far, plus the signature, to a file. '''
+		rows = {}
+		for target_idx, (hops, dist) in self.rows.items():
+			rows[target_idx] = (hops.tobytes(), dist.tobytes())
+		with open(filename, 'wb') as f:
+			pickle.dump({'signature': self.signature, 'size': self.size, 'rows': rows}, f)
+
+	def load(self, filename):
+		''' Read rows saved by save(). Returns False (and loads nothing) if the
+		file is missing or was built from a different map/profile. '''
+		try:
+			with open(filename, 'rb') as f:
+				data = pickle.load(f)
+		except (OSError, pickle.UnpicklingError, EOFError):
+			return False
+		if data.get('signature') != self.signature or data.get('size') != self.size:
+			return False
+		self.rows = {}
+		for target_idx, (hops_bytes, dist_bytes) in data['rows'].items():
+			hops, dist = array('l'), array('d')
+			hops.frombytes(hops_bytes)
+			dist.frombytes(dist_bytes)
+			self.rows[target_idx] = (hops, dist)
+		return True
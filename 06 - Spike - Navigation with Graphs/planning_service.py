@@ -0,0 +1,150 @@
+import os
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from searches import Path, SearchAStar
+
+# worker side: dict of {profile: (version, graph snapshot)}, the snapshots
+# this worker process has loaded (see _plan_batch)
+_graphs = {}
+
+def _plan_batch(profile, version, filename, queries, search):
+	''' Worker side: run the search for each (source_idx, target_idx) query on
+	the graph snapshot of the profile. A worker only loads a snapshot (from
+	the file set_graph wrote it to) when it has an older one, so chunks of
+	queries don't need to carry it. Only the path nodes and steps go back,
+	not the Path (which would send the graph back too). '''
+	installed = _graphs.get(profile)
+	if installed is None or installed[0] != version:
+		with open(filename, 'rb') as f:
+			installed = (version, pickle.load(f))
+		_graphs[profile] = installed
+	graph = installed[1]
+	results = []
+	for source_idx, target_idx in queries:
+		path = search(graph, source_idx, target_idx)
+		results.append((source_idx, target_idx, path.path, path.steps))
+	return results
+
+
+class PlanningService(object):
+	''' Plans batches of paths on a pool of worker processes.
+
+	Each traversal profile has one read-only graph snapshot (set with
+	set_graph), with a version number. The same workers are used for the
+	life of the service: a new snapshot (after box edits) is written to a
+	temporary file once, and chunks of queries only carry its version and
+	file name, so each worker loads it at most once. Chunks queued on an old
+	snapshot are cancelled, and the results of running ones are dropped.
+	Queries are (profile, source_idx, target_idx) tuples; identical queries,
+	in the same batch or already being planned, are only planned once.
+	Finished paths are collected with poll(), from the game thread, without
+	waiting.
+
+	The search and the snapshots must be picklable (e.g. SearchAStar and a
+	BoxGrid.snapshot(), not a graph using a BoxWorld method as cost_h).
+	'''
+
+	def __init__(self, workers=None, search=SearchAStar):
+		self.workers = workers or os.cpu_count() or 1
+		self.executor = None # started by the first submit
+		self.search = search
+		self.graphs = {} # dict of {profile: graph snapshot}
+		self.versions = {} # dict of {profile: snapshot version}
+		self.folder = None # temporary folder of the snapshot files
+		self.files = {} # dict of {(profile, version): snapshot file name}
+		self.snapshots = 0 # snapshot files written, for their names
+		self.futures = [] # list of (profile, version, Future) items
+		self.pending = set() # queries being planned
+		self.hits = 0 # queries that were already being planned
+
+	def set_graph(self, profile, graph):
+		''' Use a new graph snapshot for the profile. Chunks still queued on
+		the old one are cancelled, and running ones are dropped when they
+		finish. '''
+		version = self.versions.get(profile, 0) + 1
+		if self.folder is None:
+			self.folder = tempfile.mkdtemp(prefix='planning_service_')
+		self.snapshots += 1
+		filename = os.path.join(self.folder, 'snapshot%d.pickle' % self.snapshots)
+		with open(filename, 'wb') as f:
+			pickle.dump(graph, f, pickle.HIGHEST_PROTOCOL)
+		self.graphs[profile] = graph
+		self.versions[profile] = version
+		self.files[(profile, version)] = filename
+		self.pending = set(query for query in self.pending if query[0] != profile)
+		for old_profile, old_version, future in self.futures:
+			if old_profile == profile:
+				future.cancel()
+		self._remove_files()
+
+	def _remove_files(self):
+		''' Remove the snapshot files no worker can need any more: not the
+		current snapshot, and no chunk on it still queued or running. '''
+		needed = set((profile, version) for profile, version, future in self.futures if not future.done())
+		needed.update(self.versions.items())
+		for key in list(self.files):
+			if key not in needed:
+				os.remove(self.files.pop(key))
+
+	def submit(self, queries):
+		''' Start planning the batch of (profile, source_idx, target_idx)
+		queries, split into one chunk per worker for each profile. '''
+		if self.executor is None:
+			self.executor = ProcessPoolExecutor(max_workers=self.workers)
+		batches = {}
+		for query in queries:
+			if query in self.pending:
+				self.hits += 1
+				continue
+			self.pending.add(query)
+			batches.setdefault(query[0], []).append(query[1:])
+		for profile, batch in batches.items():
+			size = (len(batch) + self.workers - 1) // self.workers
+			for i in range(0, len(batch), size):
+				version = self.versions[profile]
+				future = self.executor.submit(_plan_batch, profile, version, self.files[(profile, version)],
+					batch[i:i + size], self.search)
+				self.futures.append((profile, version, future))
+
+	def poll(self):
+		''' Return a dict of {(profile, source_idx, target_idx): Path} for the
+		queries finished since the last call. Never waits. '''
+		results = {}
+		running = []
+		for profile, version, future in self.futures:
+			if not future.done():
+				running.append((profile, version, future))
+				continue
+			if version != self.versions[profile] or future.cancelled():
+				continue # planned on an old snapshot
+			graph = self.graphs[profile]
+			for source_idx, target_idx, nodes, steps in future.result():
+				query = (profile, source_idx, target_idx)
+				self.pending.discard(query)
+				route = {}
+				if nodes:
+					route[nodes[0]] = nodes[0] # to:from
+					for from_idx, to_idx in zip(nodes[:-1], nodes[1:]):
+						route[to_idx] = from_idx
+				results[query] = Path(graph, route, target_idx, [], set(), steps)
+		self.futures = running
+		self._remove_files()
+		return results
+
+	def busy(self):
+		return len(self.futures) > 0
+
+	def shutdown(self):
+		''' Drop the queued chunks, wait for the running ones to end and
+		remove the snapshot files. '''
+		if self.executor is not None:
+			self.executor.shutdown(wait=True, cancel_futures=True)
+			self.executor = None
+		self.futures = []
+		if self.folder is not None:
+			shutil.rmtree(self.folder, ignore_errors=True)
+			self.folder = None
+			self.files = {}
@@ -1,21 +1,47 @@
-from heapq import heappush, heappop
+from time import perf_counter
 
 class PriorityQueue(object):
-	''' Cost sorted (min-to-max) queue. Equal cost items revert to FIFO order.'''
+	''' Cost sorted (min-to-max) queue. Equal cost items revert to FIFO order.
+	Each queued item is indexed by its heap slot, so membership, cost lookup,
+	remove and decrease_key do not need to scan the queue. Items must be
+	hashable and can only be queued once.'''
 
 	def __init__(self):
-		self.q = []
+		self.q = [] # binary heap of (cost, order, item) tuples
+		self.pos = {} # dict of {item: heap slot} items
 		self.i = 0 # default order counter
 
 	def push(self, item, cost):
 		'''Add an item and its cost to the queue. '''
-		heappush(self.q, (cost, self.i, item))
+		assert item not in self.pos, 'item already queued'
+		self.q.append((cost, self.i, item))
+		self.pos[item] = len(self.q) - 1
 		self.i += 1
+		self._sift_up(len(self.q) - 1)
 
 	def pop(self):
 		'''Remove the item of lowest cost, or FIFO order if cost equal.
 		Returns the item (whatever it is) and the cost as a tuple. '''
-		cost, i, item = heappop(self.q)
+		cost, i, item = self.q[0]
+		self._remove_slot(0)
+		return item, cost
+
+	def decrease_key(self, item, cost):
+		'''Lower the cost of a queued item. The item is then ordered as if it
+		was just pushed. Returns False (and changes nothing) if the new cost is
+		not better than the current one. '''
+		slot = self.pos[item]
+		if self.q[slot][0] <= cost:
+			return False
+		self.q[slot] = (cost, self.i, item)
+		self.i += 1
+		self._sift_up(slot)
+		return True
+
+	def top(self):
+		'''Return the (item, cost) tuple that pop would return, without
+		removing it. '''
+		cost, i, item = self.q[0]
 		return item, cost
 
 	def __len__(self):
@@ -26,7 +52,7 @@ class PriorityQueue(object):
 		return 'pq: ' + str(sorted(self.q))
 
 	def __contains__(self, item):
-		return any(item == values[2] for values in self.q)
+		return item in self.pos
 
 	def __iter__(self):
 		'''Support iteration. This enables support of the "in" operator. '''
@@ -34,66 +60,208 @@ class PriorityQueue(object):
 
 	def peek(self, item):
 		'''Return a tuple of (item, cost) if it exists, without removing. '''
-		for values in self.q:
-			if values[2] == item:
-				return (item, values[0])
+		if item in self.pos:
+			return (item, self.q[self.pos[item]][0])
 
 	def remove(self, item):
-		'''Remove the first item that matches.'''
-		for i, values in enumerate(self.q):
-			if values[2] == item:
-				del self.q[i]
-				return
+		'''Remove the item if it is queued.'''
+		if item in self.pos:
+			self._remove_slot(self.pos[item])
+
+	def _remove_slot(self, slot):
+		''' Fill the slot with the last entry and restore the heap order. '''
+		del self.pos[self.q[slot][2]]
+		last = self.q.pop()
+		if slot < len(self.q):
+			self.q[slot] = last
+			self.pos[last[2]] = slot
+			self._sift_up(slot)
+			self._sift_down(self.pos[last[2]])
+
+	def _sift_up(self, slot):
+		q, pos = self.q, self.pos
+		entry = q[slot]
+		while slot > 0:
+			parent = (slot - 1) >> 1
+			if q[parent] <= entry:
+				break
+			q[slot] = q[parent]
+			pos[q[slot][2]] = slot
+			slot = parent
+		q[slot] = entry
+		pos[entry[2]] = slot
+
+	def _sift_down(self, slot):
+		q, pos = self.q, self.pos
+		entry = q[slot]
+		end = len(q)
+		child = 2 * slot + 1
+		while child < end:
+			if child + 1 < end and q[child + 1] < q[child]:
+				child += 1
+			if entry <= q[child]:
+				break
+			q[slot] = q[child]
+			pos[q[slot][2]] = slot
+			slot = child
+			child = 2 * slot + 1
+		q[slot] = entry
+		pos[entry[2]] = slot
 
 
 class Path(object):
-	''' Convenient container and converter for route-path information'''
-	def __init__(self, graph, route, target_idx, open, closed, steps):
-		# keep any data if we are asked
+	''' Convenient container and converter for route-path information.
+	Only the route dict and the target are kept; the list of path nodes and
+	its cost are worked out on first use (with the graph as it is then).
+	The open and closed containers of the search are only kept if verbosity
+	is 2 or more (see report), otherwise just their sizes. '''
+
+	verbosity = 1 # default for new paths, set to 3 to keep everything
+
+	def __init__(self, graph, route, target_idx, open, closed, steps, verbosity=None):
+		if verbosity is None:
+			verbosity = Path.verbosity
+		self.graph = graph
 		self.route = route
-		self.open = open
-		self.closed = closed
 		self.target_idx = target_idx
 		self.steps = steps
+		self.open_count = len(open)
+		self.closed_count = len(closed)
+		# keep any data if we are asked
+		self.open = open if verbosity > 1 else None
+		self.closed = closed if verbosity > 1 else None
+		self._path = None
+		self._path_cost = None
 
-		# Convert dictionary back in to a list of nodes for a path
 		if target_idx in route:
-			path = []
-			curr_idx = target_idx
-			while curr_idx != route[curr_idx]:
-				path.append(curr_idx)
-				curr_idx = route[curr_idx]
 			self.result = 'Success! '
-
 			self.result += 'Still going...' if target_idx in open else 'Done!'
-			path.append(curr_idx)
-			path.reverse()
-			self.path = path
-			self.path_cost = str(graph.path_cost(path))
-			self.source_idx = curr_idx
 		else:
 			self.result = 'Failed.'
-			self.path = []
-			self.path_cost = '---'
 
-	
+	@property
+	def path(self):
+		''' List of node idx values from the source to the target. '''
+		if self._path is None:
+			# Convert dictionary back in to a list of nodes for a path
+			path = []
+			route = self.route
+			if self.target_idx in route:
+				curr_idx = self.target_idx
+				while curr_idx != route[curr_idx]:
+					path.append(curr_idx)
+					curr_idx = route[curr_idx]
+				path.append(curr_idx)
+				path.reverse()
+			self._path = path
+		return self._path
+
+	@property
+	def path_cost(self):
+		if self._path_cost is None:
+			if self.path:
+				self._path_cost = str(self.graph.path_cost(self.path))
+			else:
+				self._path_cost = '---'
+		return self._path_cost
+
+	@property
+	def source_idx(self):
+		return self.path[0] if self.path else None
+
 	def report(self, verbose=3):
 		tmp = "%s Steps: %d Cost: %s\n" % (self.result, self.steps, self.path_cost)
 		if verbose > 0:
 			tmp += "Path (%d)=%s\n"  % (len(self.path), self.path)
 		if verbose > 1:
-			tmp += "Open (%d)=%s\n"   % (len(self.open), self.open)
-			tmp += "Closed (%d)=%s\n"   % (len(self.closed), self.closed)
+			tmp += "Open (%d)=%s\n"   % (self.open_count, self.open if self.open is not None else '...')
+			tmp += "Closed (%d)=%s\n"   % (self.closed_count, self.closed if self.closed is not None else '...')
 		if verbose > 2:
 			tmp += "Route (%d)=%s\n"   % (len(self.route), self.route)
 		return tmp
 
-def SearchAStar(graph, source_idx, target_idx, limit=0):
-	''' A* Search. Expand the minimum path cost-so-far + lowest heuristic cost. '''
+class PathTree(object):
+	''' Shortest path tree from one root node, as found by SearchDijkstraTree.
+	Keeps the cost-so-far (dist) and the predecessor (route) of every settled
+	node, so the best path to (or, for a reverse search, from) any of them
+	can be read off without searching again. '''
+	def __init__(self, root_idx, dist, route, open, closed, steps, reverse=False):
+		self.root_idx = root_idx
+		self.dist = dist # dict of {idx: cost-so-far}
+		self.route = route # dict of {to:from} items, root maps to itself
+		self.open = open
+		self.closed = closed
+		self.steps = steps
+		self.reverse = reverse
+
+	def __contains__(self, idx):
+		''' True if the node was settled, i.e. its cost is final. '''
+		return idx in self.closed
+
+	def cost(self, idx):
+		''' Cost of the best path between the root and idx (inf if unknown). '''
+		return self.dist[idx] if idx in self.closed else float('inf')
+
+	def get_path(self, graph, idx):
+		''' Return a Path between the root and idx. For a normal tree the path
+		runs root -> idx; for a reverse tree (searched on graph.reverse()) it
+		runs idx -> root. graph must be the forward graph, for the path cost. '''
+		if idx not in self.closed:
+			return Path(graph, {}, idx, self.open, self.closed, self.steps)
+		nodes = [idx]
+		while nodes[-1] != self.route[nodes[-1]]:
+			nodes.append(self.route[nodes[-1]])
+		if not self.reverse:
+			nodes.reverse()
+		# Path wants a {to:from} route, so give it one for just these nodes
+		route = {nodes[0]: nodes[0]}
+		for from_idx, to_idx in zip(nodes[:-1], nodes[1:]):
+			route[to_idx] = from_idx
+		return Path(graph, route, nodes[-1], self.open, self.closed, self.steps)
+
+
+class SearchTask(object):
+	''' A search that can be run a slice at a time and resumed later, without
+	redoing any work. Made from one of the Iter* generator searches, which
+	yield (after each expansion) a function that returns the current Path (a
+	PathTree for IterDijkstraTree). '''
+	def __init__(self, search):
+		self.search = search # generator
+		self.result = None # function that returns the current Path
+		self.steps = 0 # expansions done so far
+		self.done = False
+
+	def run(self, steps=0, seconds=0.0):
+		''' Expand up to steps more nodes and/or for up to seconds (0 means
+		no limit), but always at least one node, then return the current Path.
+		'''
+		deadline = perf_counter() + seconds if seconds > 0 else None
+		count = 0
+		while not self.done:
+			try:
+				self.result = next(self.search)
+			except StopIteration:
+				self.done = True
+				break
+			self.steps += 1
+			count += 1
+			# out of budget?
+			if steps > 0 and count >= steps:
+				break
+			if deadline is not None and perf_counter() >= deadline:
+				break
+		return self.result()
+
+
+def IterAStar(graph, source_idx, target_idx):
+	''' A* Search as a generator for SearchTask. Expand the minimum path
+	cost-so-far + lowest heuristic cost. '''
 	closed = set() # set - of visited nodes
 	route = {} # dict of {to:from} items to find our way home
 	open = PriorityQueue() # priority queue of the current leaf edges
 	steps = 0
+	def result():
+		return Path(graph, route, target_idx, open, closed, steps)
 	# add starting node, with F = cost-so-far (G) + heuristic (H)
 	open.push(source_idx, graph.cost_h(source_idx, target_idx) )
 	route[source_idx] = source_idx
@@ -103,29 +271,301 @@ def SearchAStar(graph, source_idx, target_idx, limit=0):
 		leaf, cost_f = open.pop() # get the lowest cost-so-far node to investigate
 		closed.add(leaf) # set 'visited'
 		if leaf == target_idx:
+			yield result
 			break
 		else:
 			# use the old cost_f to get the real base cost_g for the path so-far
 			cost = cost_f - graph.cost_h(leaf, target_idx)
 			# get new children
-			idxs = graph.get_neighbours(leaf)
-			for dest in idxs:
+			for dest, edge_cost in graph.get_neighbour_costs(leaf):
 				if dest not in closed: # visited
-					cost_g = cost + graph.get_edge(leaf, dest).cost # G cost-so-far
+					cost_g = cost + edge_cost # G cost-so-far
 					cost_h = graph.cost_h(dest, target_idx) # H estimated-cost
 					cost_f = cost_g + cost_h
 					if dest in open:
-						if open.peek(dest)[1] <= cost_f:
+						if not open.decrease_key(dest, cost_f):
 							continue
-						else:
-							open.remove(dest)
+					else:
+						open.push(dest, cost_f)
 					route[dest] = leaf
-					open.push(dest, cost_f)
-		# stop early?
-		if limit > 0 and steps >= limit:
+		# pause here, the caller decides when to go on
+		yield result
+
+def SearchAStar(graph, source_idx, target_idx, limit=0):
+	''' A* Search. Expand the minimum path cost-so-far + lowest heuristic cost. '''
+	# return the partial/complete path details
+	return SearchTask(IterAStar(graph, source_idx, target_idx)).run(steps=limit)
+
+def _jps_blocked(grid, x, y, region):
+	''' For pruning, a box of another cost counts like a wall: the paths
+	around it are no longer equal, so the ones through it must be kept. '''
+	return grid.cost_at(x, y) != region
+
+def _jps_open(grid, x, y, target_idx):
+	''' True if a run can step onto box (x, y). Walls have no moves out, but
+	a wall can still be the target. '''
+	if not grid.in_grid(x, y):
+		return False
+	return grid.cost_at(x, y) != float('inf') or y * grid.nx + x == target_idx
+
+def _jps_jump(grid, x, y, dx, dy, target_idx, region):
+	''' Step from box (x, y) in direction (dx, dy) over boxes of the region
+	cost, and return the idx of the next jump point, or None. '''
+	while True:
+		x += dx
+		y += dy
+		if not _jps_open(grid, x, y, target_idx):
+			return None
+		idx = y * grid.nx + x
+		if idx == target_idx or grid.cost_at(x, y) != region:
+			return idx # a cost boundary is always a jump point
+		if dx and dy: # diagonal
+			if _jps_blocked(grid, x - dx, y, region) and _jps_open(grid, x - dx, y + dy, target_idx):
+				return idx
+			if _jps_blocked(grid, x, y - dy, region) and _jps_open(grid, x + dx, y - dy, target_idx):
+				return idx
+			if _jps_jump(grid, x, y, dx, 0, target_idx, region) is not None:
+				return idx
+			if _jps_jump(grid, x, y, 0, dy, target_idx, region) is not None:
+				return idx
+		elif dx: # horizontal
+			if _jps_blocked(grid, x, y + 1, region) and _jps_open(grid, x + dx, y + 1, target_idx):
+				return idx
+			if _jps_blocked(grid, x, y - 1, region) and _jps_open(grid, x + dx, y - 1, target_idx):
+				return idx
+		else: # vertical
+			if _jps_blocked(grid, x + 1, y, region) and _jps_open(grid, x + 1, y + dy, target_idx):
+				return idx
+			if _jps_blocked(grid, x - 1, y, region) and _jps_open(grid, x - 1, y + dy, target_idx):
+				return idx
+
+def _jps_directions(grid, leaf, parent):
+	''' Return the (dx, dy) directions worth jumping in from leaf, given the
+	jump point it was reached from. '''
+	nx = grid.nx
+	x, y = leaf % nx, leaf // nx
+	px, py = parent % nx, parent // nx
+	region = grid.cost(leaf)
+	# the start, or a box where the cost changes, gets all its neighbours
+	if leaf == parent or grid.cost(parent) != region:
+		return [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+	dx = (x > px) - (x < px)
+	dy = (y > py) - (y < py)
+	if dx and dy: # diagonal: natural and forced neighbours
+		dirs = [(dx, 0), (0, dy), (dx, dy)]
+		if _jps_blocked(grid, x - dx, y, region):
+			dirs.append((-dx, dy))
+		if _jps_blocked(grid, x, y - dy, region):
+			dirs.append((dx, -dy))
+	elif dx: # horizontal
+		dirs = [(dx, 0)]
+		if _jps_blocked(grid, x, y + 1, region):
+			dirs.append((dx, 1))
+		if _jps_blocked(grid, x, y - 1, region):
+			dirs.append((dx, -1))
+	else: # vertical
+		dirs = [(0, dy)]
+		if _jps_blocked(grid, x + 1, y, region):
+			dirs.append((1, dy))
+		if _jps_blocked(grid, x - 1, y, region):
+			dirs.append((-1, dy))
+	return dirs
+
+def _jps_fill_route(grid, route, target_idx):
+	''' Jump points are joined by straight or diagonal runs of boxes. Put
+	the boxes in between back into the route along the final path, so the
+	Path is a normal box by box path. '''
+	if target_idx not in route:
+		return route
+	route = dict(route)
+	nx = grid.nx
+	curr_idx = target_idx
+	while curr_idx != route[curr_idx]:
+		from_idx = route[curr_idx]
+		dx = (from_idx % nx > curr_idx % nx) - (from_idx % nx < curr_idx % nx)
+		dy = (from_idx // nx > curr_idx // nx) - (from_idx // nx < curr_idx // nx)
+		step_idx = curr_idx + dy * nx + dx
+		while step_idx != from_idx:
+			route[curr_idx] = step_idx
+			curr_idx = step_idx
+			step_idx = curr_idx + dy * nx + dx
+		route[curr_idx] = from_idx
+		curr_idx = from_idx
+	return route
+
+def IterJPS(grid, source_idx, target_idx):
+	''' Jump Point Search as a generator for SearchTask. A* over a BoxGrid
+	that only expands "jump points", skipping the runs of boxes that any of
+	many equal paths could cross. Weighted version: a run only continues over
+	boxes of the same cost, and boxes where the cost changes are always
+	expanded in full. '''
+	closed = set() # set - of visited nodes
+	route = {} # dict of {to:from} items to find our way home
+	cost_g = {source_idx: 0.0} # dict of {idx: cost-so-far}
+	open = PriorityQueue() # priority queue of the current jump points
+	steps = 0
+	def result():
+		return Path(grid, _jps_fill_route(grid, route, target_idx), target_idx, open, closed, steps)
+	open.push(source_idx, grid.cost_h(source_idx, target_idx))
+	route[source_idx] = source_idx
+	# search loop
+	while len(open):
+		steps += 1
+		leaf, cost_f = open.pop()
+		closed.add(leaf) # set 'visited'
+		if leaf == target_idx:
+			yield result
+			break
+		x, y = leaf % grid.nx, leaf // grid.nx
+		region = grid.cost(leaf)
+		if region == float('inf'):
+			yield result
+			continue # no moves out of a wall
+		for dx, dy in _jps_directions(grid, leaf, route[leaf]):
+			dest = _jps_jump(grid, x, y, dx, dy, target_idx, region)
+			if dest is None or dest in closed:
+				continue
+			g = cost_g[leaf] + grid.move_cost(leaf, dest)
+			cost_f = g + grid.cost_h(dest, target_idx)
+			if dest in open:
+				if not open.decrease_key(dest, cost_f):
+					continue
+			else:
+				open.push(dest, cost_f)
+			cost_g[dest] = g
+			route[dest] = leaf
+		# pause here, the caller decides when to go on
+		yield result
+
+def SearchJPS(grid, source_idx, target_idx, limit=0):
+	''' Jump Point Search (see IterJPS) over a BoxGrid. '''
+	# return the partial/complete path details
+	return SearchTask(IterJPS(grid, source_idx, target_idx)).run(steps=limit)
+
+def IterThetaStar(grid, source_idx, target_idx):
+	''' Theta* Search as a generator for SearchTask. A* over a BoxGrid where
+	a box can be reached straight from the parent of the box being expanded,
+	if there is a line of sight between them, so paths are any-angle lines
+	with far fewer waypoints than box by box moves. A line only crosses boxes
+	of one cost (see BoxGrid.line_of_sight), so the path costs are exact. The
+	Path holds just the waypoints. '''
+	closed = set() # set - of visited nodes
+	route = {} # dict of {to:from} items (waypoint parents) to find our way home
+	cost_g = {source_idx: 0.0} # dict of {idx: cost-so-far}
+	open = PriorityQueue() # priority queue of the current leaf edges
+	steps = 0
+	def result():
+		return Path(grid, route, target_idx, open, closed, steps)
+	open.push(source_idx, grid.cost_h(source_idx, target_idx))
+	route[source_idx] = source_idx
+	# search loop
+	while len(open):
+		steps += 1
+		leaf, cost_f = open.pop()
+		closed.add(leaf) # set 'visited'
+		if leaf == target_idx:
+			yield result
 			break
+		parent = route[leaf]
+		for dest, edge_cost in grid.get_neighbour_costs(leaf):
+			if dest in closed:
+				continue
+			from_idx, g = leaf, cost_g[leaf] + edge_cost
+			# straight from the parent instead, if it can see dest
+			if parent != leaf and grid.line_of_sight(parent, dest):
+				line_g = cost_g[parent] + grid.move_cost(parent, dest)
+				if line_g <= g:
+					from_idx, g = parent, line_g
+			cost_f = g + grid.cost_h(dest, target_idx)
+			if dest in open:
+				if not open.decrease_key(dest, cost_f):
+					continue
+			else:
+				open.push(dest, cost_f)
+			cost_g[dest] = g
+			route[dest] = from_idx
+		# pause here, the caller decides when to go on
+		yield result
+
+def SearchThetaStar(grid, source_idx, target_idx, limit=0):
+	''' Theta* any-angle Search (see IterThetaStar) over a BoxGrid. '''
 	# return the partial/complete path details
-	return Path(graph, route, target_idx, open, closed, steps)
+	return SearchTask(IterThetaStar(grid, source_idx, target_idx)).run(steps=limit)
+
+def IterSearch(search, *args):
+	''' Run any other search (or anything else that returns a Path) in one
+	go, as a generator for SearchTask. '''
+	path = search(*args)
+	def result():
+		return path
+	yield result
+
+def SearchHPAStar(grid, source_idx, target_idx, limit=0):
+	''' Hierarchical A* (HPA*) on a BoxGrid. Plans on the abstract graph of
+	box clusters kept by the grid (see hpa_star.ClusterAbstraction) and only
+	refines the parts of it that the route uses. The limit applies to the
+	abstract search steps. '''
+	return grid.get_abstraction().get_path(source_idx, target_idx, limit)
+
+def IterDijkstraTree(graph, root_idx, targets=None, stop='all', reverse=False):
+	''' One-to-all Dijkstra Search as a generator for SearchTask. The result
+	is a PathTree, see SearchDijkstraTree. '''
+	assert stop in ('all', 'any'), 'stop must be "all" or "any"'
+	closed = set() # set - of visited (settled) nodes
+	route = {} # dict of {to:from} items to find our way home
+	dist = {} # dict of {idx: cost-so-far}
+	open = PriorityQueue() # priority queue of the current leaf edges
+	remaining = set(targets) if targets is not None else None
+	steps = 0
+	def result():
+		return PathTree(root_idx, dist, route, open, closed, steps, reverse)
+
+	open.push(root_idx, 0.0)
+	route[root_idx] = root_idx # to:from
+	# search loop
+	while len(open):
+		steps += 1
+		leaf, cost = open.pop() # get the lowest cost-so-far node to investigate
+		closed.add(leaf)
+		dist[leaf] = cost
+		if remaining is not None and leaf in remaining:
+			remaining.discard(leaf)
+			if stop == 'any' or not remaining:
+				yield result
+				break
+		for dest, edge_cost in graph.get_neighbour_costs(leaf):
+			if dest not in closed: # visited
+				cost_g = cost + edge_cost
+				if dest in open:
+					if not open.decrease_key(dest, cost_g):
+						continue
+				else:
+					open.push(dest, cost_g)
+				route[dest] = leaf # to:from
+		# pause here, the caller decides when to go on
+		yield result
+
+def SearchDijkstraTree(graph, root_idx, targets=None, stop='all', limit=0, reverse=False):
+	''' One-to-all Dijkstra Search. Settles nodes in cost-so-far order and
+	returns the whole shortest path tree (PathTree) instead of a single path.
+	If targets is given the search stops once "all" of them (or "any" one of
+	them) are settled, otherwise it runs until every reachable node is done.
+	To share one search between many sources going to the same target, search
+	graph.reverse() from the target with reverse=True. '''
+	# return the partial/complete tree details
+	return SearchTask(IterDijkstraTree(graph, root_idx, targets, stop, reverse)).run(steps=limit)
+
+# A simple dictionary with string keys to each search class type.
+SEARCHES = {
+	1: SearchAStar,
+	2: SearchJPS,
+	3: SearchHPAStar,
+	4: SearchThetaStar,
+}
+
+# Searches that run on a BoxGrid rather than a SparseGraph
+GRID_SEARCHES = (SearchJPS, SearchHPAStar, SearchThetaStar)
+
 
 #==============================================================================
 
@@ -169,4 +609,11 @@ if __name__ == '__main__':
 	if False:
 		g.cost_h = SimpleTestHeuristic
 		print('from 1 to 3 A*:')
-		print(SearchAStar(g, 1, 3))
\ No newline at end of file
+		print(SearchAStar(g, 1, 3))
+	# the same searches on a frozen (CSR) snapshot, and backwards from a target
+	frozen = g.freeze()
+	print(frozen.summary())
+	print('from 1 to every node, frozen:')
+	print(SearchDijkstraTree(frozen, 1).dist)
+	print('to 3 from every node, frozen reverse:')
+	print(SearchDijkstraTree(frozen.reverse(), 3, reverse=True).dist)